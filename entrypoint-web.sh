@@ -10,8 +10,9 @@ python manage.py migrate --noinput
 # Collect static
 python manage.py collectstatic --noinput || true
 
-# Start celery in background
-celery -A product_importer.celery worker --loglevel=info --concurrency=1 &
+# Start celery in background, consuming the default and webhook queues, with
+# embedded beat for the stalled-upload watchdog and the webhook outbox relay
+celery -A product_importer.celery worker -Q celery,webhooks --beat --loglevel=info --concurrency=1 &
 
 # Start Gunicorn
-exec gunicorn product_importer.wsgi:application --bind 0.0.0.0:8000
+exec gunicorn product_importer.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
@@ -136,13 +136,142 @@ STATICFILES_DIRS = [
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
+
+# Shared cache (dashboard statistics)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'product_importer',
+        'OPTIONS': {
+            'socket_timeout': 2,
+            'socket_connect_timeout': 2,
+        },
+    }
+}
+
+# Upload status counts are cached until an upload changes status, and for
+# at most this many seconds
+UPLOAD_STATS_CACHE_TTL = int(os.environ.get('UPLOAD_STATS_CACHE_TTL', 60))
+
 # Celery Configuration
-CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
-CELERY_RESULT_BACKEND = os.environ.get('REDIS_URL', 'redis://localhost:6379')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Import tasks are acknowledged late so a killed worker's task is re-delivered;
+# don't let a worker reserve messages it may never get to.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# CSV import engine: 'auto' uses PostgreSQL COPY when available and a native
+# ORM upsert otherwise; 'copy', 'upsert' or 'orm' force a specific engine.
+IMPORT_ENGINE = os.environ.get('IMPORT_ENGINE', 'auto')
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+
+# Parallel imports: default bytes per chunk task and chunk tasks in flight,
+# both overridable per upload.
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 16 * 1024 * 1024))
+IMPORT_PARALLELISM = int(os.environ.get('IMPORT_PARALLELISM', 4))
+
+# Pipelined imports: writer threads committing batches while the file is
+# parsed, and batches queued per writer before parsing waits for them
+IMPORT_PIPELINE_WRITERS = int(os.environ.get('IMPORT_PIPELINE_WRITERS', 2))
+IMPORT_PIPELINE_DEPTH = int(os.environ.get('IMPORT_PIPELINE_DEPTH', 2))
+
+# Live upload counters are kept in Redis and copied to the uploads table at
+# most once per this many seconds while an import runs.
+UPLOAD_PROGRESS_FLUSH_INTERVAL = float(os.environ.get('UPLOAD_PROGRESS_FLUSH_INTERVAL', 5))
+
+# Progress streams (SSE and long-poll): how often Redis is checked, how often
+# the uploads row is re-read as a safety net, and how long a stream stays open.
+UPLOAD_EVENTS_POLL_INTERVAL = float(os.environ.get('UPLOAD_EVENTS_POLL_INTERVAL', 0.5))
+UPLOAD_EVENTS_DB_INTERVAL = float(os.environ.get('UPLOAD_EVENTS_DB_INTERVAL', 10))
+UPLOAD_EVENTS_MAX_SECONDS = float(os.environ.get('UPLOAD_EVENTS_MAX_SECONDS', 300))
+
+# Resumable imports: a running import holds a lease that lapses this many
+# seconds after its last progress update. The watchdog re-queues uploads
+# with no lease and no progress for UPLOAD_STALL_TIMEOUT seconds, at most
+# UPLOAD_MAX_RESUMES times, checking every UPLOAD_WATCHDOG_INTERVAL seconds.
+UPLOAD_LEASE_TIMEOUT = int(os.environ.get('UPLOAD_LEASE_TIMEOUT', 120))
+UPLOAD_STALL_TIMEOUT = int(os.environ.get('UPLOAD_STALL_TIMEOUT', 900))
+UPLOAD_MAX_RESUMES = int(os.environ.get('UPLOAD_MAX_RESUMES', 3))
+UPLOAD_WATCHDOG_INTERVAL = float(os.environ.get('UPLOAD_WATCHDOG_INTERVAL', 60))
+
+# Seconds between runs of the webhook outbox relay
+WEBHOOK_OUTBOX_RELAY_INTERVAL = float(os.environ.get('WEBHOOK_OUTBOX_RELAY_INTERVAL', 2))
+
+CELERY_BEAT_SCHEDULE = {
+    'requeue-stalled-uploads': {
+        'task': 'uploads.tasks.requeue_stalled_uploads',
+        'schedule': UPLOAD_WATCHDOG_INTERVAL,
+    },
+    'relay-webhook-outbox': {
+        'task': 'webhooks.tasks.relay_outbox_events',
+        'schedule': WEBHOOK_OUTBOX_RELAY_INTERVAL,
+    },
+    'prune-webhook-deliveries': {
+        'task': 'webhooks.tasks.prune_webhook_deliveries',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+# Webhook tasks run on their own queue so slow or dead subscribers can't hold
+# up import workers: run a worker with `-Q webhooks` (or `-Q celery,webhooks`).
+CELERY_TASK_ROUTES = {
+    'webhooks.tasks.*': {'queue': 'webhooks'},
+}
+
+# Bulk product jobs: rows per DELETE/UPDATE statement, each in its own
+# short transaction
+BULK_OPERATION_BATCH_SIZE = int(os.environ.get('BULK_OPERATION_BATCH_SIZE', 5000))
+
+# Webhook delivery: subscribers of an event are called concurrently, at most
+# WEBHOOK_MAX_CONCURRENCY at a time (also the keep-alive pool size per host).
+WEBHOOK_MAX_CONCURRENCY = int(os.environ.get('WEBHOOK_MAX_CONCURRENCY', 10))
+WEBHOOK_CONNECT_TIMEOUT = float(os.environ.get('WEBHOOK_CONNECT_TIMEOUT', 3))
+WEBHOOK_READ_TIMEOUT = float(os.environ.get('WEBHOOK_READ_TIMEOUT', 10))
+
+# Webhook outbox: events relayed per transaction, and how long one relay run
+# keeps draining before leaving the rest to the next beat tick.
+WEBHOOK_OUTBOX_BATCH_SIZE = int(os.environ.get('WEBHOOK_OUTBOX_BATCH_SIZE', 500))
+WEBHOOK_OUTBOX_RELAY_MAX_SECONDS = float(os.environ.get('WEBHOOK_OUTBOX_RELAY_MAX_SECONDS', 30))
+
+# Failed deliveries are retried up to WEBHOOK_MAX_ATTEMPTS times, waiting
+# WEBHOOK_RETRY_BASE_DELAY * 2^(attempt - 1) seconds (with jitter, capped at
+# WEBHOOK_RETRY_MAX_DELAY, below the Redis broker's 1 hour visibility timeout).
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', 6))
+WEBHOOK_RETRY_BASE_DELAY = float(os.environ.get('WEBHOOK_RETRY_BASE_DELAY', 30))
+WEBHOOK_RETRY_MAX_DELAY = float(os.environ.get('WEBHOOK_RETRY_MAX_DELAY', 1800))
+
+# Circuit breaker: after WEBHOOK_CIRCUIT_FAILURE_THRESHOLD failures in a row an
+# endpoint is left alone for WEBHOOK_CIRCUIT_RESET_TIMEOUT seconds, then probed.
+# Deliveries held back by an open circuit give up after WEBHOOK_DELIVERY_EXPIRY
+# seconds; finished delivery records are kept WEBHOOK_DELIVERY_RETENTION_DAYS.
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('WEBHOOK_CIRCUIT_FAILURE_THRESHOLD', 5))
+WEBHOOK_CIRCUIT_RESET_TIMEOUT = float(os.environ.get('WEBHOOK_CIRCUIT_RESET_TIMEOUT', 300))
+WEBHOOK_DELIVERY_EXPIRY = float(os.environ.get('WEBHOOK_DELIVERY_EXPIRY', 24 * 60 * 60))
+WEBHOOK_DELIVERY_RETENTION_DAYS = int(os.environ.get('WEBHOOK_DELIVERY_RETENTION_DAYS', 14))
+
+# Active subscriptions per event type are cached in Redis and in memory; a
+# process re-checks the cache version at most this often, in seconds.
+WEBHOOK_SUBSCRIPTION_CACHE_TTL = float(os.environ.get('WEBHOOK_SUBSCRIPTION_CACHE_TTL', 5))
+
+# Imports and bulk jobs report changed products as events carrying at most
+# this many SKUs each.
+WEBHOOK_EVENT_PAGE_SIZE = int(os.environ.get('WEBHOOK_EVENT_PAGE_SIZE', 1000))
+
+# Bulk product API: payloads with up to this many valid rows are written
+# within the request; larger ones are staged and imported by Celery
+PRODUCT_BULK_SYNC_MAX_ROWS = int(os.environ.get('PRODUCT_BULK_SYNC_MAX_ROWS', 1000))
+
+# Product export: rows fetched per round trip from the (server-side) cursor
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+# Chunked uploads: largest accepted chunk body in bytes
+UPLOAD_SESSION_MAX_CHUNK_SIZE = int(os.environ.get('UPLOAD_SESSION_MAX_CHUNK_SIZE', 32 * 1024 * 1024))
 
 # Windows-specific Celery settings to avoid multiprocessing issues
 if os.name == 'nt':
@@ -1,11 +1,12 @@
 from django.shortcuts import render
 from django.http import JsonResponse
 from uploads.models import Upload
+from uploads.progress import apply_live_progress
 
 
 def home(request):
     # Get recent uploads for display
-    recent_uploads = Upload.objects.all().order_by('-created_at')[:10]
+    recent_uploads = apply_live_progress(list(Upload.objects.all().order_by('-created_at')[:10]))
     return render(request, 'home.html', {'recent_uploads': recent_uploads})
 
 
@@ -0,0 +1,54 @@
+"""
+Product filters shared by the list endpoint and bulk operations.
+
+Bulk jobs store the filters as JSON and re-apply them in the worker, so
+``filter_products`` accepts both query parameters (strings) and JSON values.
+"""
+from rest_framework.exceptions import ValidationError
+from .search import search_products
+
+PRODUCT_FILTER_PARAMS = ('q', 'sku', 'name', 'is_active', 'ids')
+
+
+def get_product_filters(params):
+    """
+    Pick the product filters out of query parameters or a JSON body
+    """
+    return {key: params.get(key) for key in PRODUCT_FILTER_PARAMS if params.get(key) not in (None, '')}
+
+
+def parse_ids(ids):
+    """
+    Product ids from a JSON list, or comma-separated in a query string
+    """
+    if isinstance(ids, str):
+        ids = [value for value in ids.split(',') if value.strip()]
+    try:
+        return [int(value) for value in ids]
+    except (TypeError, ValueError):
+        raise ValidationError({'ids': 'Expected a comma-separated list of product ids'})
+
+
+def filter_products(queryset, filters):
+    """
+    Apply the product filters; raises ``ValidationError`` for malformed ``ids``
+    """
+    sku = filters.get('sku', None)
+    name = filters.get('name', None)
+    is_active = filters.get('is_active', None)
+    q = filters.get('q', None)
+    ids = filters.get('ids', None)
+    
+    if ids:
+        queryset = queryset.filter(pk__in=parse_ids(ids))
+    if q:
+        queryset = search_products(queryset, q)
+    if sku:
+        queryset = queryset.filter(sku__icontains=sku)
+    if name:
+        queryset = queryset.filter(name__icontains=name)
+    if is_active is not None:
+        is_active = str(is_active).lower() == 'true'
+        queryset = queryset.filter(is_active=is_active)
+    
+    return queryset
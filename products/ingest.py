@@ -0,0 +1,230 @@
+"""
+Bulk product ingest from JSON records.
+
+Records are normalized the way the CSV importer normalizes rows (same
+column aliases, SKU stripped and uppercased) and written through the same
+``process_product_batch`` path, so both routes treat a product identically.
+Up to ``PRODUCT_BULK_SYNC_MAX_ROWS`` records are applied within the
+request; larger payloads are staged as an Upload and merged by Celery.
+"""
+import logging
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ParseError
+from uploads.mapping import DESCRIPTION_FIELDS, NAME_FIELDS, SKU_FIELDS
+from uploads.models import StagedProduct, Upload
+from uploads.tasks import add_content_hashes, process_csv_upload, process_product_batch, \
+    resolve_import_engine, write_batch_bisecting
+from webhooks.outbox import enqueue_sku_pages
+from webhooks.subscriptions import has_subscribers
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+SKU_MAX_LENGTH = Product._meta.get_field('sku').max_length
+
+# A JSON record's ``id`` is usually a database id, not a SKU alias as in CSV
+# headers
+JSON_SKU_FIELDS = SKU_FIELDS - {'id'}
+
+
+def normalize_record(record):
+    """
+    Turn one JSON record into a product row.
+
+    Returns ``(row, None)``, or ``(None, error)`` when the record is unusable.
+    """
+    if isinstance(record, ParseError):
+        return None, str(record.detail)
+    if not isinstance(record, dict):
+        return None, 'Expected a JSON object'
+
+    sku = name = None
+    description = ''
+    is_active = True
+    exact = set()
+    for key, value in record.items():
+        key_lower = key.lower().strip()
+        if key_lower == 'is_active':
+            is_active = value
+            continue
+        if key_lower in JSON_SKU_FIELDS:
+            field = 'sku'
+        elif key_lower in NAME_FIELDS:
+            field = 'name'
+        elif key_lower in DESCRIPTION_FIELDS:
+            field = 'description'
+        else:
+            continue
+        # A field's own name wins over its aliases whatever the key order;
+        # otherwise later matches win, as in ColumnMapping.from_header
+        if field in exact:
+            continue
+        if key_lower == field:
+            exact.add(field)
+        if value is None:
+            value = ''
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        elif not isinstance(value, str):
+            return None, f"'{key}' must be a string"
+        if field == 'sku':
+            sku = value.strip().upper() or None
+        elif field == 'name':
+            name = value.strip() or None
+        else:
+            description = value.strip()
+
+    if not sku:
+        return None, 'Missing SKU'
+    if len(sku) > SKU_MAX_LENGTH:
+        return None, f"SKU longer than {SKU_MAX_LENGTH} characters"
+    if not name:
+        return None, 'Missing name'
+    if not isinstance(is_active, bool):
+        return None, "'is_active' must be true or false"
+
+    return {'sku': sku, 'name': name, 'description': description, 'is_active': is_active}, None
+
+
+def ingest_records(records):
+    """
+    Apply JSON records, synchronously when there are few of them.
+
+    ``records`` may be a list or a lazy iterator (NDJSON). Records are read
+    until more than ``PRODUCT_BULK_SYNC_MAX_ROWS`` valid rows have been
+    seen; if the input ends first they are written right away, otherwise
+    everything is staged for Celery. Returns ``(mode, summary)``.
+    """
+    records = iter(records)
+    sync_limit = settings.PRODUCT_BULK_SYNC_MAX_ROWS
+    rows = []
+    invalid = []
+
+    for index, record in enumerate(records):
+        row, error = normalize_record(record)
+        if error:
+            invalid.append({'index': index, 'status': 'invalid', 'error': error})
+            continue
+        row['position'] = index
+        rows.append(row)
+        if len(rows) > sync_limit:
+            return 'async', stage_records(rows, invalid, records, index + 1)
+
+    return 'sync', apply_records(rows, invalid)
+
+
+def apply_records(rows, invalid):
+    """
+    Write the rows now and report what happened to each record.
+
+    The stored content hashes are read before and after the write (two
+    queries), which tells created, updated, unchanged and rejected rows
+    apart without a query per row. Earlier records for a SKU repeated
+    later in the payload are ``superseded``: the last one wins.
+    """
+    add_content_hashes(rows)
+    latest = {row['sku']: row['position'] for row in rows}
+    skus = list(latest)
+
+    with transaction.atomic():
+        before = dict(Product.objects.filter(sku__in=skus).values_list('sku', 'content_hash'))
+        batch = [{field: row[field] for field in ('sku', 'name', 'description', 'is_active', 'content_hash')}
+                 for row in rows if latest[row['sku']] == row['position']]
+        if batch:
+            process_product_batch(batch, None, resolve_import_engine())
+        after = dict(Product.objects.filter(sku__in=skus).values_list('sku', 'content_hash'))
+
+        results = []
+        for row in rows:
+            sku = row['sku']
+            if latest[sku] != row['position']:
+                row_status = 'superseded'
+            elif after.get(sku) != row['content_hash']:
+                row_status = 'rejected'
+            elif sku not in before:
+                row_status = 'created'
+            elif before[sku] == row['content_hash']:
+                row_status = 'unchanged'
+            else:
+                row_status = 'updated'
+            results.append({'index': row['position'], 'sku': sku, 'status': row_status})
+
+        changed = [result['sku'] for result in results if result['status'] in ('created', 'updated')]
+        if changed and has_subscribers('products_upserted'):
+            enqueue_sku_pages('products_upserted', changed, source='bulk_ingest')
+
+    results.extend(invalid)
+    results.sort(key=lambda result: result['index'])
+    counts = Counter(result['status'] for result in results)
+    return {
+        'total': len(results),
+        'created': counts['created'],
+        'updated': counts['updated'],
+        'unchanged': counts['unchanged'],
+        'failed': counts['invalid'] + counts['rejected'],
+        'results': results,
+    }
+
+
+def stage_records(rows, invalid, records, next_index):
+    """
+    Stage the rows read so far and the rest of ``records`` as an Upload
+    in ``bulk`` mode, then hand it to ``process_csv_upload``.
+
+    Rows are staged in ``IMPORT_BATCH_SIZE`` batches as they are read, so
+    a streamed payload is never held in memory. Only the invalid records
+    get a per-record status; the rest are counted on the upload.
+    """
+    batch_size = settings.IMPORT_BATCH_SIZE
+
+    with transaction.atomic():
+        upload = Upload.objects.create(file='', import_mode='bulk', progress_mode='exact')
+
+        def stage_batch(batch):
+            add_content_hashes(batch)
+            StagedProduct.objects.bulk_create([StagedProduct(upload_id=upload.id, **row) for row in batch])
+
+        staged = 0
+        failed = len(invalid)
+
+        def flush(batch):
+            nonlocal staged, failed
+            written = write_batch_bisecting(batch, stage_batch, upload.id)
+            staged += written
+            failed += len(batch) - written
+
+        for start in range(0, len(rows), batch_size):
+            flush(rows[start:start + batch_size])
+
+        batch = []
+        for index, record in enumerate(records, next_index):
+            row, error = normalize_record(record)
+            if error:
+                invalid.append({'index': index, 'status': 'invalid', 'error': error})
+                failed += 1
+                continue
+            row['position'] = index
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+        # The import derives its row count from these two
+        upload.total_rows = staged + failed
+        upload.failed_rows = failed
+        upload.save()
+
+        transaction.on_commit(lambda: process_csv_upload.delay(upload.id))
+
+    logger.info(f"Upload {upload.id}: staged {staged} products from the bulk API, {failed} failed")
+    return {
+        'upload': upload,
+        'total': staged + failed,
+        'staged': staged,
+        'failed': failed,
+        'results': invalid,
+    }
@@ -0,0 +1,90 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from products.models import Product
+from products.search import search_products, supports_indexed_search
+
+WORDS = [
+    'cotton', 'shirt', 'denim', 'jacket', 'leather', 'wallet', 'steel', 'bottle', 'wireless', 'speaker',
+    'organic', 'coffee', 'ceramic', 'mug', 'running', 'shoes', 'wool', 'scarf', 'bamboo', 'towel',
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure product search latency (p50/p95) for substring and full-text queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--populate', type=int, default=0,
+            help='Insert this many synthetic products first (e.g. 1000000)'
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query')
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Commit the synthetic products instead of rolling them back'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['populate']:
+                self.populate(options['populate'])
+
+            total = Product.objects.count()
+            mode = 'indexed (pg_trgm + tsvector)' if supports_indexed_search() else 'icontains fallback'
+            self.stdout.write(f"Searching {total} products, {mode}")
+
+            for label, build in self.queries():
+                timings = []
+                for _ in range(options['repeat']):
+                    started_at = time.perf_counter()
+                    list(build()[:20])
+                    timings.append((time.perf_counter() - started_at) * 1000)
+                p50 = statistics.median(timings)
+                p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+                self.stdout.write(self.style.SUCCESS(f"{label:>24}: p50 {p50:.1f}ms, p95 {p95:.1f}ms"))
+                self.explain(build())
+
+            if options['populate'] and not options['keep']:
+                transaction.set_rollback(True)
+
+    def queries(self):
+        products = Product.objects.all()
+        return [
+            ('sku substring', lambda: products.filter(sku__icontains='12345')),
+            ('name substring', lambda: products.filter(name__icontains='leather wal')),
+            ('q= single word', lambda: search_products(products, 'coffee')),
+            ('q= phrase', lambda: search_products(products, 'wireless speaker')),
+            ('q= sku fragment', lambda: search_products(products, 'BM-0042')),
+        ]
+
+    def explain(self, queryset):
+        """
+        Show the top plan node on PostgreSQL so a sequential scan stands out
+        """
+        if connection.vendor != 'postgresql':
+            return
+        plan = queryset[:20].explain()
+        self.stdout.write('    ' + next((line.strip() for line in plan.splitlines() if 'Scan' in line), plan.splitlines()[0]))
+
+    def populate(self, rows, batch_size=10000):
+        """
+        Insert synthetic products in batches, then refresh planner statistics
+        """
+        rng = random.Random(42)
+        started_at = time.monotonic()
+        for start in range(0, rows, batch_size):
+            batch = []
+            for i in range(start, min(start + batch_size, rows)):
+                words = rng.sample(WORDS, 3)
+                batch.append(Product(
+                    sku=f"BM-{i:08d}",
+                    name=' '.join(words).title(),
+                    description=f"{' '.join(rng.sample(WORDS, 8))} item {i}",
+                ))
+            Product.objects.bulk_create(batch, ignore_conflicts=True)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE products")
+        self.stdout.write(f"Inserted {rows} products in {time.monotonic() - started_at:.1f}s")
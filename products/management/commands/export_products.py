@@ -0,0 +1,55 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from products.export import EXPORT_FORMATS, export_blocks
+from products.filters import filter_products
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Stream products (optionally filtered) to a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', default='-', help='Output path, or - for stdout (default)')
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Gzip the output (implied by an output path ending in .gz)'
+        )
+        parser.add_argument('--q', help='Search term, as for the product list')
+        parser.add_argument('--sku', help='SKU contains')
+        parser.add_argument('--name', help='Name contains')
+        parser.add_argument('--is-active', dest='is_active', choices=['true', 'false'])
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per cursor round trip')
+
+    def handle(self, *args, **options):
+        filters = {
+            name: options[name] for name in ('q', 'sku', 'name', 'is_active')
+            if options[name] is not None
+        }
+        queryset = filter_products(Product.objects.all(), filters)
+        output = options['output']
+        compress = options['gzip'] or output.endswith('.gz')
+
+        blocks = export_blocks(
+            queryset, options['export_format'], compress=compress, chunk_size=options['chunk_size']
+        )
+        started_at = time.monotonic()
+        written = 0
+        try:
+            stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        except OSError as e:
+            raise CommandError(f"Cannot open {output}: {e}")
+        try:
+            for block in blocks:
+                stream.write(block)
+                written += len(block)
+        finally:
+            if output != '-':
+                stream.close()
+            else:
+                stream.flush()
+
+        # Progress goes to stderr so it never mixes with an export on stdout
+        elapsed = time.monotonic() - started_at
+        self.stderr.write(f"Exported {written} bytes in {elapsed:.2f}s")
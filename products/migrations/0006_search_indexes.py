@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Must match products.search.SEARCH_VECTOR_SQL
+SEARCH_VECTOR_SQL = "to_tsvector('english', COALESCE(name, '') || ' ' || COALESCE(description, ''))"
+
+# The trigram indexes cover the UPPER(col::text) LIKE '%x%' that icontains
+# compiles to on PostgreSQL; the tsvector index covers ?q= word search.
+SEARCH_INDEXES = {
+    'products_sku_trgm_idx': "USING gin (UPPER(sku::text) gin_trgm_ops)",
+    'products_name_trgm_idx': "USING gin (UPPER(name::text) gin_trgm_ops)",
+    'products_search_fts_idx': f"USING gin (({SEARCH_VECTOR_SQL}))",
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, definition in SEARCH_INDEXES.items():
+        # CONCURRENTLY keeps imports and edits running while a large table is indexed
+        schema_editor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON products {definition}")
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('products', '0005_product_updated_at_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
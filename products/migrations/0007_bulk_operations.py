@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('delete', 'Delete')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('filters', models.JSONField(blank=True, default=dict)),
+                ('total_rows', models.BigIntegerField(default=0)),
+                ('processed_rows', models.BigIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'product_bulk_operations',
+                'indexes': [models.Index(fields=['status'], name='product_bul_status_49c633_idx'), models.Index(fields=['created_at'], name='product_bul_created_475e35_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_bulk_operations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkoperation',
+            name='patch',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='bulkoperation',
+            name='operation',
+            field=models.CharField(choices=[('delete', 'Delete'), ('update', 'Update')], max_length=20),
+        ),
+    ]
@@ -1,22 +1,94 @@
+import hashlib
 from django.db import models
 
 
+def content_hash(name, description, is_active):
+    """
+    Fingerprint of the imported product fields, as 16 hex characters.
+
+    Imports compare it with the stored value to skip rows that have not
+    changed, so it must be computed over the same normalized values the
+    importer writes.
+    """
+    content = f"{name}\x1f{description or ''}\x1f{int(bool(is_active))}"
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=8).hexdigest()
+
+
 class Product(models.Model):
     sku = models.CharField(max_length=100, unique=True, db_index=True)
     name = models.TextField()
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    content_hash = models.CharField(max_length=16, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.content_hash = content_hash(self.name, self.description, self.is_active)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content_hash' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'content_hash']
+        super().save(*args, **kwargs)
+
     class Meta:
         db_table = 'products'
         indexes = [
             models.Index(fields=['sku']),
             models.Index(fields=['is_active']),
             models.Index(fields=['created_at']),
+            # Keyset pagination in change order
+            models.Index(fields=['updated_at', 'id']),
         ]
         ordering = ['id']  # Maintain consistent ordering by ID
+
+
+class BulkOperation(models.Model):
+    """
+    A bulk change to the products matching a set of filters, run as a Celery job.
+
+    ``filters`` holds the same parameters the product list accepts; an empty
+    set means every product. ``patch`` holds the field values an update
+    sets. ``total_rows`` is taken when the job starts and may be an estimate.
+    """
+    OPERATION_CHOICES = [
+        ('delete', 'Delete'),
+        ('update', 'Update'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    operation = models.CharField(max_length=20, choices=OPERATION_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    filters = models.JSONField(default=dict, blank=True)
+    patch = models.JSONField(default=dict, blank=True)
+    total_rows = models.BigIntegerField(default=0)
+    processed_rows = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Bulk {self.operation} {self.id} - {self.status}"
+    
+    @property
+    def progress_percentage(self):
+        if self.status == 'completed':
+            return 100
+        if self.total_rows > 0:
+            return round(min(100, (self.processed_rows / self.total_rows) * 100), 2)
+        return 0
+    
+    class Meta:
+        db_table = 'product_bulk_operations'
+        indexes = [
+            models.Index(fields=['status']),
+            models.Index(fields=['created_at']),
+        ]
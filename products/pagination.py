@@ -0,0 +1,191 @@
+"""
+Keyset (cursor) pagination for large product listings.
+
+Page-number pagination runs a COUNT(*) and an OFFSET scan for every page,
+so deep pages get slower as the catalog grows. A keyset page instead
+filters on the sort key of the last row seen (``WHERE id > ...``), which
+uses the index no matter how deep the page is.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .stats import estimate_count
+
+# Supported ``ordering`` values; ``id`` breaks ties so every key is unique
+KEYSET_ORDERINGS = {
+    'id': ('id',),
+    '-id': ('-id',),
+    'updated_at': ('updated_at', 'id'),
+    '-updated_at': ('-updated_at', '-id'),
+}
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique sort key with opaque next/previous tokens.
+
+    ``ordering`` picks one of ``KEYSET_ORDERINGS`` (default ``id``). The
+    total is skipped unless ``count=approx`` (planner estimate) or
+    ``count=exact`` is requested.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        ordering = request.query_params.get('ordering', 'id')
+        if ordering not in KEYSET_ORDERINGS:
+            raise NotFound(f"Unsupported ordering '{ordering}'")
+        self.ordering = KEYSET_ORDERINGS[ordering]
+
+        position, reverse = self.decode_cursor(request)
+        order = [self._invert(field) for field in self.ordering] if reverse else list(self.ordering)
+
+        self.count = self.get_count(queryset, request)
+
+        if position is not None:
+            queryset = queryset.filter(self._after(position, order))
+        results = list(queryset.order_by(*order)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        # Walking backwards, "more" rows lie before this page; and having
+        # come from a cursor means there are rows after it, and vice versa.
+        if reverse:
+            self.has_previous, self.has_next = has_more, position is not None
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get('count')
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'approx':
+            return estimate_count(queryset)
+        return None
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._key(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._key(self.page[0]), reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        token = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+        return replace_query_param(remove_query_param(self.base_url, 'page'), self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        """
+        Return ``(position, reverse)`` from the request's cursor token
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            position, reverse = data['p'], bool(data['r'])
+            if len(position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def _key(self, instance):
+        """
+        Serializable sort key of a row (datetimes as ISO strings)
+        """
+        key = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip('-'))
+            key.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return key
+
+    def _after(self, position, order):
+        """
+        Filter for rows strictly after ``position`` in the given ordering:
+        (a > x) OR (a = x AND b > y) for a two-column key.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(order, position):
+            name = field.lstrip('-')
+            lookup = f"{name}__lt" if field.startswith('-') else f"{name}__gt"
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f"-{field}"
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django paginator whose total is the planner's estimate
+    """
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+class ProductPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination that can skip the exact COUNT(*) with ``count=approx``.
+
+    With an estimated total, the last pages may come back short or empty.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('count') == 'approx':
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
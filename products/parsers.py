@@ -0,0 +1,35 @@
+import json
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+def iter_ndjson(stream, encoding='utf-8'):
+    """
+    Decode one JSON value per line as the stream is read.
+
+    Blank lines are skipped. A line that is not valid JSON yields a
+    ``ParseError`` in its place instead of ending the stream, so callers
+    can report it as a bad row and carry on.
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line.decode(encoding))
+        except ValueError as e:
+            yield ParseError(f"Line {line_number}: invalid JSON ({str(e)})")
+
+
+class NDJSONParser(BaseParser):
+    """
+    Newline-delimited JSON, parsed lazily: ``request.data`` is an iterator
+    over the decoded lines, so the body is never held in memory at once
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return iter(())
+        parser_context = parser_context or {}
+        return iter_ndjson(stream, parser_context.get('encoding', 'utf-8'))
@@ -0,0 +1,52 @@
+"""
+Product search.
+
+On PostgreSQL, substring matches on ``sku``/``name`` are served by pg_trgm GIN
+indexes and word matches by a GIN index over the name+description tsvector
+(see migration 0006). The expressions below must stay identical to the
+indexed ones or the planner falls back to a sequential scan. Other
+databases keep the plain ``icontains`` filters.
+"""
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'english'
+
+# Indexed expression; column references are unqualified so the same SQL
+# works in CREATE INDEX and in queries on the products table
+SEARCH_VECTOR_SQL = (
+    f"to_tsvector('{SEARCH_CONFIG}', COALESCE(name, '') || ' ' || COALESCE(description, ''))"
+)
+SEARCH_QUERY_SQL = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+
+
+def supports_indexed_search():
+    return connection.vendor == 'postgresql'
+
+
+def search_products(queryset, q):
+    """
+    Filter products matching ``q`` in the SKU, name or description.
+
+    On PostgreSQL the results carry a ``search_rank`` annotation (full-text
+    relevance); unordered callers get the best matches first.
+    """
+    q = q.strip()
+    if not q:
+        return queryset
+
+    substring = Q(sku__icontains=q) | Q(name__icontains=q)
+
+    if not supports_indexed_search():
+        return queryset.filter(substring | Q(description__icontains=q))
+
+    return (queryset
+            .annotate(
+                search_match=RawSQL(f"{SEARCH_VECTOR_SQL} @@ {SEARCH_QUERY_SQL}", (q,),
+                                    output_field=BooleanField()),
+                search_rank=RawSQL(f"ts_rank({SEARCH_VECTOR_SQL}, {SEARCH_QUERY_SQL})", (q,),
+                                   output_field=FloatField()),
+            )
+            .filter(substring | Q(search_match=True))
+            .order_by('-search_rank', 'id'))
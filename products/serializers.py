@@ -1,9 +1,48 @@
 from rest_framework import serializers
-from .models import Product
+from .models import Product, BulkOperation
 
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ['id', 'sku', 'name', 'description', 'is_active', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+class BulkOperationSerializer(serializers.ModelSerializer):
+    progress_percentage = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = BulkOperation
+        fields = ['id', 'operation', 'status', 'filters', 'patch', 'total_rows', 'processed_rows',
+                  'progress_percentage', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class ProductFiltersSerializer(serializers.Serializer):
+    """
+    The product list filters, as a JSON object
+    """
+    q = serializers.CharField(required=False)
+    sku = serializers.CharField(required=False)
+    name = serializers.CharField(required=False)
+    is_active = serializers.BooleanField(required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+
+
+class ProductPatchSerializer(serializers.Serializer):
+    """
+    Field values to set on every matched product
+    """
+    name = serializers.CharField(required=False)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    is_active = serializers.BooleanField(required=False)
+    
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('Set at least one of name, description or is_active')
+        return attrs
+
+
+class ProductBulkUpdateSerializer(serializers.Serializer):
+    filters = ProductFiltersSerializer(required=False)
+    patch = ProductPatchSerializer()
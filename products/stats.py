@@ -0,0 +1,41 @@
+"""
+Product counts that avoid a full COUNT(*) on large tables.
+
+PostgreSQL keeps a row estimate per table in ``pg_class.reltuples``,
+refreshed by VACUUM/ANALYZE (including autovacuum), and the planner can
+estimate any filtered query. Both are close enough for display; callers
+that need the precise number ask for an exact count.
+"""
+import json
+from django.db import connection
+from .models import Product
+
+
+def approximate_product_count():
+    """
+    Estimated number of products; exact when no estimate exists yet
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                           [Product._meta.db_table])
+            row = cursor.fetchone()
+        # -1 (or 0 on older versions) until the table is first analyzed
+        if row and row[0] > 0:
+            return row[0]
+    return Product.objects.count()
+
+
+def estimate_count(queryset):
+    """
+    Planner row estimate for a queryset on PostgreSQL, exact count elsewhere
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
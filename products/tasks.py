@@ -0,0 +1,175 @@
+from celery import shared_task
+from .models import Product, BulkOperation
+from .filters import filter_products
+from .stats import estimate_count
+from webhooks.outbox import enqueue_event, enqueue_sku_pages
+from webhooks.subscriptions import has_subscribers
+import logging
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def iter_pk_batches(queryset, batch_size):
+    """
+    Yield the primary keys of ``queryset`` in ascending batches.
+
+    Each batch starts after the last key of the previous one, so every
+    lookup is an index range scan however far the job has got, and rows
+    changed by earlier batches are never visited twice.
+    """
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        pks = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def batch_queryset(pks, filtered):
+    """
+    Rows of one batch: a plain key range when every product is targeted,
+    the matched keys otherwise
+    """
+    if not filtered:
+        return Product.objects.filter(pk__gte=pks[0], pk__lte=pks[-1])
+    return Product.objects.filter(pk__in=pks)
+
+
+@shared_task
+def run_bulk_delete(operation_id):
+    """
+    Delete the products matching a bulk operation's filters.
+
+    Deleting everything on PostgreSQL is a single TRUNCATE. Otherwise rows
+    are deleted in primary-key batches of ``BULK_OPERATION_BATCH_SIZE``,
+    each in its own transaction, with progress saved after every batch.
+    """
+    try:
+        operation = BulkOperation.objects.get(id=operation_id)
+        operation.status = 'processing'
+        operation.save()
+
+        filtered = bool(operation.filters)
+        queryset = filter_products(Product.objects.all(), operation.filters)
+
+        if not filtered and connection.vendor == 'postgresql':
+            operation.total_rows = Product.objects.count()
+            operation.save()
+            with connection.cursor() as cursor:
+                cursor.execute(f"TRUNCATE {Product._meta.db_table}")
+            deleted = operation.total_rows
+        else:
+            operation.total_rows = estimate_count(queryset)
+            operation.save()
+            # Deleting everything is reported by all_products_deleted alone
+            report_skus = filtered and has_subscribers('products_deleted')
+            page = 1
+            deleted = 0
+            for pks in iter_pk_batches(queryset, settings.BULK_OPERATION_BATCH_SIZE):
+                with transaction.atomic():
+                    rows = batch_queryset(pks, filtered)
+                    if report_skus:
+                        page = enqueue_sku_pages('products_deleted', list(rows.values_list('sku', flat=True)), page,
+                                                 source='bulk_delete', operation_id=operation.id)
+                    count, _ = rows.delete()
+                deleted += count
+                BulkOperation.objects.filter(id=operation.id).update(processed_rows=deleted, updated_at=timezone.now())
+
+        # One notification for the whole job, committed with its completion
+        with transaction.atomic():
+            operation.processed_rows = deleted
+            operation.status = 'completed'
+            operation.save()
+            if filtered:
+                enqueue_event('products_bulk_deleted', {
+                    'event': 'products_bulk_deleted',
+                    'operation_id': operation.id,
+                    'count': deleted,
+                    'filters': operation.filters,
+                    'timestamp': timezone.now().isoformat()
+                })
+            else:
+                enqueue_event('all_products_deleted', {
+                    'event': 'all_products_deleted',
+                    'count': deleted,
+                    'timestamp': timezone.now().isoformat()
+                })
+        logger.info(f"Bulk delete {operation.id}: deleted {deleted} products")
+
+        return f"Deleted {deleted} products"
+
+    except BulkOperation.DoesNotExist:
+        return f"Bulk operation with id {operation_id} not found"
+    except Exception as e:
+        logger.error(f"Bulk delete {operation_id} failed: {str(e)}")
+        BulkOperation.objects.filter(id=operation_id).update(status='failed', error=str(e), updated_at=timezone.now())
+        return f"Failed to delete products: {str(e)}"
+
+
+@shared_task
+def run_bulk_update(operation_id):
+    """
+    Apply a bulk operation's field patch to the products matching its filters.
+
+    Rows are updated with set-based UPDATEs in primary-key batches of
+    ``BULK_OPERATION_BATCH_SIZE``. Rows that already hold the patched
+    values are skipped so they are not rewritten. The content hash can't
+    be computed in SQL, so it is cleared and the next import rewrites
+    those rows once.
+    """
+    try:
+        operation = BulkOperation.objects.get(id=operation_id)
+        operation.status = 'processing'
+        operation.save()
+
+        filtered = bool(operation.filters)
+        patch = operation.patch
+        queryset = filter_products(Product.objects.all(), operation.filters).exclude(Q(**patch))
+
+        operation.total_rows = estimate_count(queryset)
+        operation.save()
+
+        report_skus = has_subscribers('products_upserted')
+        page = 1
+        updated = 0
+        for pks in iter_pk_batches(queryset, settings.BULK_OPERATION_BATCH_SIZE):
+            with transaction.atomic():
+                rows = batch_queryset(pks, filtered).exclude(Q(**patch))
+                if report_skus:
+                    page = enqueue_sku_pages('products_upserted', list(rows.values_list('sku', flat=True)), page,
+                                             source='bulk_update', operation_id=operation.id)
+                updated += rows.update(**patch, content_hash=None, updated_at=timezone.now())
+            BulkOperation.objects.filter(id=operation.id).update(processed_rows=updated, updated_at=timezone.now())
+
+        # One notification for the whole job instead of one per product,
+        # committed with its completion
+        with transaction.atomic():
+            operation.processed_rows = updated
+            operation.status = 'completed'
+            operation.save()
+            enqueue_event('products_bulk_updated', {
+                'event': 'products_bulk_updated',
+                'operation_id': operation.id,
+                'count': updated,
+                'filters': operation.filters,
+                'patch': patch,
+                'timestamp': timezone.now().isoformat()
+            })
+        logger.info(f"Bulk update {operation.id}: updated {updated} products with {patch}")
+
+        return f"Updated {updated} products"
+
+    except BulkOperation.DoesNotExist:
+        return f"Bulk operation with id {operation_id} not found"
+    except Exception as e:
+        logger.error(f"Bulk update {operation_id} failed: {str(e)}")
+        BulkOperation.objects.filter(id=operation_id).update(status='failed', error=str(e), updated_at=timezone.now())
+        return f"Failed to update products: {str(e)}"
@@ -1,3 +1,67 @@
-from django.test import TestCase
+import csv
+import io
+from django.test import TestCase, override_settings
+from .models import Product
 
-# Create your tests here.
+
+class ProductFilterTests(TestCase):
+    def setUp(self):
+        self.products = [
+            Product.objects.create(sku=f"SKU-{i}", name=f"Product {i}") for i in range(3)
+        ]
+
+    def test_ids_filter(self):
+        ids = f"{self.products[0].id},{self.products[2].id}"
+        response = self.client.get('/api/products/', {'ids': ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({product['sku'] for product in response.json()['results']}, {'SKU-0', 'SKU-2'})
+
+    def test_malformed_ids_are_rejected(self):
+        for path in ('/api/products/', '/api/products/export/'):
+            response = self.client.get(path, {'ids': '1,abc'})
+            self.assertEqual(response.status_code, 400, path)
+            self.assertIn('ids', response.json())
+
+    def test_malformed_ids_are_rejected_by_bulk_delete(self):
+        response = self.client.delete('/api/products/bulk-delete/?ids=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Product.objects.count(), 3)
+
+
+class ProductExportTests(TestCase):
+    @override_settings(EXPORT_CHUNK_SIZE=100)
+    async def test_export_streams_asynchronously_under_asgi(self):
+        await Product.objects.abulk_create(
+            [Product(sku=f"SKU-{i:05}", name=f"Product {i}", description='x' * 100) for i in range(2000)]
+        )
+        response = await self.async_client.get('/api/products/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+
+        blocks = [block async for block in response.streaming_content]
+        # Sent as it is produced, not as one buffered body
+        self.assertGreater(len(blocks), 1)
+        rows = list(csv.reader(io.StringIO(b''.join(blocks).decode('utf-8'))))
+        self.assertEqual(rows[0][:3], ['sku', 'name', 'description'])
+        self.assertEqual([row[0] for row in rows[1:]], [f"SKU-{i:05}" for i in range(2000)])
+
+    def test_export_streams_synchronously_under_wsgi(self):
+        Product.objects.create(sku='SKU-1', name='Product 1')
+        response = self.client.get('/api/products/export/', {'format': 'ndjson'})
+        self.assertFalse(response.is_async)
+        self.assertIn(b'"sku":"SKU-1"', b''.join(response.streaming_content))
+
+
+class ProductBulkIngestTests(TestCase):
+    def test_sku_is_not_taken_from_id(self):
+        records = [
+            {'id': 5, 'sku': 'abc-1', 'name': 'Id first'},
+            {'sku': 'abc-2', 'id': 6, 'name': 'Sku first'},
+            {'product_id': 'abc-3', 'sku': 'abc-4', 'name': 'Alias first'},
+        ]
+        response = self.client.post('/api/products/bulk/', records, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['created'] * 3)
+        self.assertEqual(
+            set(Product.objects.values_list('sku', flat=True)), {'ABC-1', 'ABC-2', 'ABC-4'},
+        )
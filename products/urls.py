@@ -1,8 +1,16 @@
 from django.urls import path
-from .views import ProductListCreateView, ProductRetrieveUpdateDestroyView, ProductBulkDeleteView
+from .views import (
+    ProductListCreateView, ProductRetrieveUpdateDestroyView, ProductBulkDeleteView, ProductBulkUpdateView,
+    ProductBulkIngestView, BulkOperationDetailView, product_export, product_stats,
+)
 
 urlpatterns = [
     path('products/', ProductListCreateView.as_view(), name='product-list-create'),
     path('products/<int:pk>/', ProductRetrieveUpdateDestroyView.as_view(), name='product-detail'),
     path('products/bulk-delete/', ProductBulkDeleteView.as_view(), name='product-bulk-delete'),
+    path('products/bulk-update/', ProductBulkUpdateView.as_view(), name='product-bulk-update'),
+    path('products/bulk/', ProductBulkIngestView.as_view(), name='product-bulk-ingest'),
+    path('products/stats/', product_stats, name='product-stats'),
+    path('products/export/', product_export, name='product-export'),
+    path('products/bulk-operations/<int:pk>/', BulkOperationDetailView.as_view(), name='product-bulk-operation-detail'),
 ]
\ No newline at end of file
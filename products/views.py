@@ -1,36 +1,56 @@
+from collections.abc import Iterator
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_GET
 from rest_framework import generics, status
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from .models import Product
-from .serializers import ProductSerializer
-from webhooks.tasks import send_webhook_notification
+from rest_framework.views import APIView
+from .models import Product, BulkOperation
+from .pagination import KeysetPagination, ProductPageNumberPagination
+from .stats import approximate_product_count
+from .export import EXPORT_FORMATS, aiter_blocks, export_blocks
+from .ingest import ingest_records
+from .parsers import NDJSONParser
+from .filters import filter_products, get_product_filters
+from .serializers import ProductSerializer, BulkOperationSerializer, ProductBulkUpdateSerializer
+from .tasks import run_bulk_delete, run_bulk_update
+from uploads.serializers import UploadSerializer
+from webhooks.outbox import enqueue_event
+from django.db import transaction
 from django.utils import timezone
 
 
 class ProductListCreateView(generics.ListCreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = ProductPageNumberPagination
+    
+    @property
+    def paginator(self):
+        """
+        Keyset pagination with ``?pagination=cursor`` (or a ``cursor`` token),
+        page numbers otherwise
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
     
     def get_queryset(self):
-        queryset = Product.objects.all()
-        sku = self.request.query_params.get('sku', None)
-        name = self.request.query_params.get('name', None)
-        is_active = self.request.query_params.get('is_active', None)
-        
-        if sku:
-            queryset = queryset.filter(sku__icontains=sku)
-        if name:
-            queryset = queryset.filter(name__icontains=name)
-        if is_active is not None:
-            is_active = is_active.lower() == 'true'
-            queryset = queryset.filter(is_active=is_active)
-            
-        return queryset
+        return filter_products(Product.objects.all(), self.request.query_params)
         
+    @transaction.atomic
     def perform_create(self, serializer):
         product = serializer.save()
         
-        # Send webhook notification
+        # Record the webhook notification with the change; the outbox relay sends it
         payload = {
             'event': 'product_created',
             'product_id': product.id,
@@ -38,17 +58,18 @@ class ProductListCreateView(generics.ListCreateAPIView):
             'name': product.name,
             'timestamp': timezone.now().isoformat()
         }
-        send_webhook_notification.delay('product_imported', payload)
+        enqueue_event('product_imported', payload)
 
 
 class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     
+    @transaction.atomic
     def perform_update(self, serializer):
         product = serializer.save()
         
-        # Send webhook notification
+        # Record the webhook notification with the change; the outbox relay sends it
         payload = {
             'event': 'product_updated',
             'product_id': product.id,
@@ -56,14 +77,15 @@ class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
             'name': product.name,
             'timestamp': timezone.now().isoformat()
         }
-        send_webhook_notification.delay('product_updated', payload)
+        enqueue_event('product_updated', payload)
         
+    @transaction.atomic
     def perform_destroy(self, instance):
         product_id = instance.id
         product_sku = instance.sku
         product_name = instance.name
         
-        # Send webhook notification before deletion
+        # Record the webhook notification with the deletion
         payload = {
             'event': 'product_deleted',
             'product_id': product_id,
@@ -71,34 +93,138 @@ class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
             'name': product_name,
             'timestamp': timezone.now().isoformat()
         }
-        send_webhook_notification.delay('product_deleted', payload)
+        enqueue_event('product_deleted', payload)
         
         # Delete the product
         instance.delete()
 
 
 class ProductBulkDeleteView(generics.GenericAPIView):
+    """
+    Delete all products, or those matching the list filters, in a background job
+    """
+    serializer_class = BulkOperationSerializer
+    
     def delete(self, request, *args, **kwargs):
-        count = Product.objects.count()
+        filters = get_product_filters(request.query_params)
         
         # Handle edge case when there are no products
-        if count == 0:
+        if not filter_products(Product.objects.all(), filters).exists():
             return Response(
                 {'message': 'No products to delete'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        Product.objects.all().delete()
+        operation = BulkOperation.objects.create(operation='delete', filters=filters)
         
-        # Send webhook notification
-        payload = {
-            'event': 'all_products_deleted',
-            'count': count,
-            'timestamp': timezone.now().isoformat()
-        }
-        send_webhook_notification.delay('all_products_deleted', payload)
+        # Trigger the Celery task; progress is at the operation's endpoint
+        run_bulk_delete.delay(operation.id)
+        
+        return Response(self.get_serializer(operation).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ProductBulkUpdateView(generics.GenericAPIView):
+    """
+    Set fields on every product matching the list filters, in a background job
+    """
+    serializer_class = ProductBulkUpdateSerializer
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        filters = serializer.validated_data.get('filters', {})
+        patch = serializer.validated_data['patch']
         
-        return Response(
-            {'message': f'Successfully deleted {count} products'},
-            status=status.HTTP_200_OK
-        )
+        if not filter_products(Product.objects.all(), filters).exists():
+            return Response(
+                {'message': 'No products to update'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        operation = BulkOperation.objects.create(operation='update', filters=filters, patch=patch)
+        
+        # Trigger the Celery task; progress is at the operation's endpoint
+        run_bulk_update.delay(operation.id)
+        
+        return Response(BulkOperationSerializer(operation).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ProductBulkIngestView(APIView):
+    """
+    Create or update many products from a JSON array or streamed NDJSON.
+
+    Small payloads are written right away and every record gets its
+    status. Larger ones are staged as a ``bulk`` upload and imported by
+    Celery; only their invalid records are listed, the rest is tracked
+    on the upload.
+    """
+    parser_classes = (JSONParser, NDJSONParser)
+    
+    def post(self, request, *args, **kwargs):
+        records = request.data
+        if not isinstance(records, (list, Iterator)):
+            return Response(
+                {'error': 'Expected a JSON array of products or NDJSON (application/x-ndjson)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        mode, summary = ingest_records(records)
+        if mode == 'sync':
+            return Response({'mode': mode, **summary}, status=status.HTTP_200_OK)
+        
+        summary['upload'] = UploadSerializer(summary['upload']).data
+        return Response({'mode': mode, **summary}, status=status.HTTP_202_ACCEPTED)
+
+
+class BulkOperationDetailView(generics.RetrieveAPIView):
+    queryset = BulkOperation.objects.all()
+    serializer_class = BulkOperationSerializer
+
+
+@api_view(['GET'])
+def product_stats(request):
+    """
+    Product count: estimated from table statistics, exact with ``?exact=true``
+    """
+    if request.query_params.get('exact', '').lower() == 'true':
+        return Response({'count': Product.objects.count(), 'approximate': False})
+    return Response({'count': approximate_product_count(), 'approximate': True})
+
+
+@require_GET
+def product_export(request):
+    """
+    Stream the products matching the list filters as CSV or NDJSON.
+
+    ``format`` is ``csv`` (default) or ``ndjson``. Clients sending
+    ``Accept-Encoding: gzip`` get the stream gzipped on the fly;
+    ``compress=gzip`` downloads a ``.gz`` file instead. This is a plain
+    Django view because DRF reserves the ``format`` parameter.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"Unsupported format '{export_format}'"}, status=400)
+    content_type, extension = EXPORT_FORMATS[export_format]
+    filename = f"products.{extension}"
+    
+    as_file = request.GET.get('compress') == 'gzip'
+    compress = as_file or 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    
+    try:
+        queryset = filter_products(Product.objects.all(), request.GET)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+    blocks = export_blocks(queryset, export_format, compress=compress)
+    if isinstance(request, ASGIRequest):
+        blocks = aiter_blocks(blocks)
+    response = StreamingHttpResponse(
+        blocks,
+        content_type='application/gzip' if as_file else content_type
+    )
+    if as_file:
+        filename += '.gz'
+    elif compress:
+        response['Content-Encoding'] = 'gzip'
+    response['Vary'] = 'Accept-Encoding'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
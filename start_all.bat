@@ -20,7 +20,7 @@ if %errorlevel% == 1 (
 REM Start Celery Worker
 echo Starting Celery Worker...
 cd /d "E:\Fulfil_assignment\product-importer"
-start "Celery Worker" /min cmd /c ".\venv\Scripts\activate.bat && celery -A product_importer.celery worker --loglevel=info --pool=solo"
+start "Celery Worker" /min cmd /c ".\venv\Scripts\activate.bat && celery -A product_importer.celery worker -Q celery,webhooks --loglevel=info --pool=solo"
 
 REM Wait for services to start
 timeout /t 5 /nobreak >nul
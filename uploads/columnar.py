@@ -0,0 +1,174 @@
+"""
+Parquet and Arrow IPC uploads.
+
+Files are read a record batch at a time, projected to the product columns,
+and normalized with vectorized ``pyarrow.compute`` kernels: casting to
+string, trimming, uppercasing the SKU and dropping rows without a SKU or
+name happen per column instead of per row. pyarrow is only imported when
+such a file is uploaded, so CSV-only deployments don't need it.
+"""
+from products.models import Product
+from .mapping import resolve_column_mapping
+
+FILE_FORMAT_MAGIC = (
+    (b'PAR1', 'parquet'),
+    (b'ARROW1', 'arrow'),
+    # Arrow IPC streams start with a continuation marker
+    (b'\xff\xff\xff\xff', 'arrow_stream'),
+)
+
+SKU_MAX_LENGTH = Product._meta.get_field('sku').max_length
+
+
+def detect_file_format(path):
+    """
+    'parquet', 'arrow' (IPC file / Feather v2) or 'arrow_stream' from the
+    file's magic bytes; 'csv' for anything else
+    """
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, file_format in FILE_FORMAT_MAGIC:
+        if head.startswith(magic):
+            return file_format
+    return 'csv'
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Arrow uploads need the pyarrow package: pip install pyarrow")
+    return pyarrow
+
+
+class ColumnarReader:
+    """
+    Read the product columns of a Parquet or Arrow file in batches of at
+    most ``batch_size`` rows.
+
+    ``total_rows`` comes from the file metadata (None for Arrow streams,
+    whose length is only known at the end). ``position`` is how far into
+    the stored file reading has got, in bytes.
+    """
+
+    def __init__(self, path, file_format, profile=None):
+        self.pa = import_pyarrow()
+        self.path = path
+        self.file_format = file_format
+        self.source = self.pa.memory_map(path, 'r')
+        self.size = self.source.size()
+
+        if file_format == 'parquet':
+            self.reader = self.pa.parquet.ParquetFile(self.source)
+            names = self.reader.schema_arrow.names
+            self.total_rows = self.reader.metadata.num_rows
+        elif file_format == 'arrow':
+            self.reader = self.pa.ipc.open_file(self.source)
+            names = self.reader.schema.names
+            self.total_rows = sum(self.reader.get_batch(i).num_rows
+                                  for i in range(self.reader.num_record_batches))
+        else:
+            self.reader = self.pa.ipc.open_stream(self.source)
+            names = self.reader.schema.names
+            self.total_rows = None
+
+        # Same header resolution as CSV files, aliases and profiles included
+        mapping = resolve_column_mapping(names, profile)
+
+        def column_name(index):
+            return names[index] if index is not None and index < len(names) else None
+
+        self.sku_column = column_name(mapping.sku_index)
+        self.name_column = column_name(mapping.name_index)
+        self.description_column = column_name(mapping.description_index)
+        self.rows_read = 0
+
+    @property
+    def columns(self):
+        columns = (self.sku_column, self.name_column, self.description_column)
+        return list(dict.fromkeys(column for column in columns if column is not None))
+
+    @property
+    def position(self):
+        if self.file_format == 'arrow_stream':
+            return self.source.tell()
+        if not self.total_rows:
+            return self.size
+        # Batches aren't read front to back, estimate from the rows read
+        return self.size * self.rows_read // self.total_rows
+
+    def iter_batches(self, batch_size, start_row=0):
+        """
+        Yield ``(first_row, batch)`` pairs, skipping rows before ``start_row``
+        """
+        if self.file_format == 'parquet':
+            batches = self.reader.iter_batches(batch_size=batch_size, columns=self.columns)
+        elif self.file_format == 'arrow':
+            batches = (self.reader.get_batch(i) for i in range(self.reader.num_record_batches))
+        else:
+            batches = self.reader
+
+        first_row = 0
+        for batch in batches:
+            for offset in range(0, batch.num_rows, batch_size):
+                part = batch.slice(offset, batch_size)
+                end_row = first_row + part.num_rows
+                if end_row > start_row:
+                    skip = max(0, start_row - first_row)
+                    self.rows_read = end_row
+                    yield first_row + skip, part.slice(skip)
+                first_row = end_row
+        self.rows_read = first_row
+        if self.total_rows is None:
+            self.total_rows = first_row
+
+    def normalize(self, batch):
+        """
+        Product rows of a batch, normalized like ``ColumnMapping.extract``
+        does for CSV rows; returns ``(rows, failed_count)``
+        """
+        pa = self.pa
+        pc = pa.compute
+
+        sku = pc.utf8_upper(self.string_column(batch, self.sku_column))
+        name = self.string_column(batch, self.name_column)
+        sku_length = pc.utf8_length(sku)
+        valid = pc.and_kleene(
+            pc.and_kleene(pc.greater(sku_length, 0), pc.less_equal(sku_length, SKU_MAX_LENGTH)),
+            pc.greater(pc.utf8_length(name), 0),
+        ).fill_null(False)
+
+        if self.description_column is None:
+            description = pa.repeat('', len(batch))
+        else:
+            description = self.string_column(batch, self.description_column).fill_null('')
+
+        skus = sku.filter(valid).to_pylist()
+        names = name.filter(valid).to_pylist()
+        descriptions = description.filter(valid).to_pylist()
+        rows = [
+            {'sku': sku, 'name': name, 'description': description, 'is_active': True}
+            for sku, name, description in zip(skus, names, descriptions)
+        ]
+        return rows, len(batch) - len(rows)
+
+    def string_column(self, batch, column):
+        pa = self.pa
+        if column is None:
+            return pa.nulls(len(batch), pa.string())
+        values = batch.column(column)
+        if values.type != pa.string():
+            values = values.cast(pa.string())
+        return pa.compute.utf8_trim_whitespace(values)
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,308 @@
+"""
+Byte-level helpers for reading CSV uploads.
+
+These work on the raw bytes of the file so that ranges of it can be handed
+to separate workers and read back without re-scanning from the start.
+Compressed uploads are read through ``UploadReader``, which decompresses
+them as a stream.
+"""
+import bz2
+import csv
+import gzip
+import lzma
+import mmap
+import os
+import re
+import zipfile
+from functools import partial
+from itertools import islice
+
+BLOCK_SIZE = 1024 * 1024
+
+# Lines read to check that a chunk boundary starts a whole record
+BOUNDARY_CHECK_LINES = 100
+
+# Leading bytes of the compressed formats an upload may arrive in
+COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'PK\x03\x04', 'zip'),
+)
+
+
+def detect_compression(f):
+    """
+    Name of the compression format of a binary file, from its magic bytes,
+    or None for a plain file
+    """
+    position = f.tell()
+    f.seek(0)
+    head = f.read(6)
+    f.seek(position)
+    for magic, compression in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+class UploadReader:
+    """
+    Read the CSV bytes of an upload, decompressing it on the fly.
+
+    gzip, bz2, xz and single-entry zip files are recognized by their magic
+    bytes; nothing is ever inflated on disk. ``f`` is a binary file object
+    over the CSV bytes. It is seekable, though on a compressed file seeking
+    means decompressing up to the target. Progress is measured in bytes of
+    the stored file, which ``stored_offset`` gives for a CSV byte offset.
+    """
+
+    def __init__(self, path):
+        self.raw = open(path, 'rb')
+        self.archive = None
+        try:
+            self.compression = detect_compression(self.raw)
+            self.f = self._open(self.compression)
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self, compression):
+        if compression is None:
+            return self.raw
+        if compression == 'gzip':
+            return gzip.GzipFile(fileobj=self.raw, mode='rb')
+        if compression == 'bz2':
+            return bz2.BZ2File(self.raw, mode='rb')
+        if compression == 'xz':
+            return lzma.LZMAFile(self.raw, mode='rb')
+
+        self.archive = zipfile.ZipFile(self.raw)
+        # Skip the resource forks macOS adds to archives it creates
+        members = [info for info in self.archive.infolist()
+                   if not info.is_dir() and not info.filename.startswith('__MACOSX/')]
+        if len(members) != 1:
+            raise ValueError(f"Zip uploads must contain exactly one file, found {len(members)}")
+        return self.archive.open(members[0])
+
+    @property
+    def is_compressed(self):
+        return self.compression is not None
+
+    def stored_offset(self, offset):
+        """
+        How far into the stored file reading has got, given the CSV offset
+        """
+        if not self.is_compressed:
+            return offset
+        # The decompressor reads ahead a little, which is close enough
+        return self.raw.tell()
+
+    def close(self):
+        for f in (getattr(self, 'f', None), self.archive, self.raw):
+            if f is not None:
+                f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LineReader:
+    """
+    Iterate the decoded lines of a binary file, tracking the byte offset.
+
+    ``offset`` always points just past the last line handed out, so after
+    ``csv.reader`` yields a record it is the byte position where the next
+    record starts. Iteration stops at ``end`` when given.
+    """
+
+    def __init__(self, f, start=0, end=None, encoding='utf-8'):
+        self.f = f
+        self.offset = start
+        self.end = end
+        self.encoding = encoding
+        f.seek(start)
+
+    def __iter__(self):
+        for line in self.f:
+            if self.end is not None and self.offset >= self.end:
+                break
+            self.offset += len(line)
+            yield line.decode(self.encoding)
+
+
+def sniff_delimiter(f, sample_size=1024, encoding='utf-8'):
+    """
+    Detect the delimiter from the start of a binary file
+    """
+    position = f.tell()
+    f.seek(0)
+    sample = f.read(sample_size).decode(encoding, errors='ignore')
+    f.seek(position)
+    # Match what text mode would hand the sniffer, otherwise '\r' from
+    # Windows line endings can be mistaken for the delimiter.
+    sample = sample.replace('\r\n', '\n')
+    return csv.Sniffer().sniff(sample).delimiter
+
+
+def stray_quote_pattern(delimiter=','):
+    """
+    Regex matching a quote with no delimiter, line break or other quote on
+    either side. Such a quote can only sit inside an unquoted field (as in
+    ``TV 55" LED``): ``csv.reader`` keeps it as text, but it throws off the
+    quote parity the byte scans below rely on.
+    """
+    special = re.escape(delimiter.encode()) + rb'\r\n"'
+    return re.compile(rb'[^' + special + rb']"[^' + special + rb']')
+
+
+def starts_record(f, offset, columns, delimiter=','):
+    """
+    Whether the first record read from ``offset`` has ``columns`` fields,
+    i.e. ``offset`` is not in the middle of a quoted field
+    """
+    position = f.tell()
+    try:
+        lines = islice(LineReader(f, offset), BOUNDARY_CHECK_LINES)
+        record = next(csv.reader(lines, delimiter=delimiter), None)
+    except (csv.Error, UnicodeDecodeError):
+        return False
+    finally:
+        f.seek(position)
+    return record is None or len(record) == columns
+
+
+def split_csv_ranges(path, chunk_size, start=0, block_size=BLOCK_SIZE, delimiter=',', columns=None):
+    """
+    Split a CSV file into byte ranges that each begin on a record boundary.
+
+    A newline ends a record only when it sits outside a quoted field. An
+    escaped quote ("") inside a field toggles the state twice, so tracking
+    the parity of quote characters is enough to tell the two apart. The scan
+    only counts bytes with ``bytes.count``/``bytes.find``, so it runs at
+    close to disk speed.
+
+    A stray quote inside an unquoted field breaks the parity, so the scan
+    gives up (returns None) when it meets one. Each boundary is also checked
+    by parsing the record after it, which must have ``columns`` fields when
+    given; a boundary that fails the check returns None too. Callers then
+    import the file serially.
+    """
+    file_size = os.path.getsize(path)
+    ranges = []
+    range_start = start
+    target = start + chunk_size
+    in_quotes = False
+    stray_quote = stray_quote_pattern(delimiter)
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        block_start = start
+        tail = b''
+        while target < file_size:
+            block = f.read(block_size)
+            if not block:
+                break
+            # The bytes before the block let a quote on its edge be checked
+            if b'"' in tail + block and stray_quote.search(tail + block):
+                return None
+            tail = block[-2:]
+
+            cursor = 0
+            while True:
+                search_from = max(cursor, target - block_start)
+                if search_from >= len(block):
+                    break
+                in_quotes ^= block.count(b'"', cursor, search_from) % 2 == 1
+                cursor = search_from
+
+                newline = block.find(b'\n', cursor)
+                if newline == -1:
+                    break
+                in_quotes ^= block.count(b'"', cursor, newline) % 2 == 1
+                cursor = newline + 1
+                if in_quotes:
+                    # Newline inside a quoted field, keep looking
+                    continue
+
+                boundary = block_start + cursor
+                if columns is not None and not starts_record(f, boundary, columns, delimiter):
+                    return None
+                ranges.append((range_start, boundary))
+                range_start = boundary
+                target = boundary + chunk_size
+
+            in_quotes ^= block.count(b'"', cursor) % 2 == 1
+            block_start += len(block)
+
+    if range_start < file_size:
+        ranges.append((range_start, file_size))
+    return ranges
+
+
+def count_csv_records(path, block_size=BLOCK_SIZE):
+    """
+    Count the records in a CSV file, header included, without parsing it.
+
+    A plain file is memory-mapped, a compressed one decompressed as a
+    stream, and scanned in blocks. Blocks without quotes are counted with a
+    single ``bytes.count``. Otherwise the block is split on quote characters
+    and only the newlines in the unquoted segments are counted. Both are
+    C-level operations, so the scan runs far faster than ``csv.reader``.
+    A file with a stray quote in an unquoted field is counted with
+    ``csv.reader`` instead, as the quote parity can't be trusted.
+    """
+    if os.path.getsize(path) == 0:
+        return 0
+
+    with UploadReader(path) as reader:
+        try:
+            delimiter = sniff_delimiter(reader.f)
+        except csv.Error:
+            delimiter = ','
+        stray_quote = stray_quote_pattern(delimiter)
+
+        if reader.is_compressed:
+            count = count_block_records(iter(partial(reader.f.read, block_size), b''), stray_quote)
+        else:
+            with mmap.mmap(reader.raw.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                blocks = (mapped[start:start + block_size] for start in range(0, len(mapped), block_size))
+                count = count_block_records(blocks, stray_quote)
+        if count is not None:
+            return count
+        return sum(1 for _ in csv.reader(LineReader(reader.f), delimiter=delimiter))
+
+
+def count_block_records(blocks, stray_quote=None):
+    """
+    Count the records in a stream of byte blocks; None if ``stray_quote``
+    matches, as the count would be wrong
+    """
+    count = 0
+    in_quotes = False
+    last_byte = b''
+    tail = b''
+    for block in blocks:
+        if not block:
+            continue
+        last_byte = block[-1:]
+        if not in_quotes and b'"' not in tail + block:
+            count += block.count(b'\n')
+            tail = block[-2:]
+            continue
+        if stray_quote is not None and stray_quote.search(tail + block):
+            return None
+        tail = block[-2:]
+
+        segments = block.split(b'"')
+        unquoted = segments[1::2] if in_quotes else segments[0::2]
+        count += b''.join(unquoted).count(b'\n')
+        in_quotes ^= (len(segments) - 1) % 2 == 1
+
+    # The last record may not end with a newline
+    if last_byte and last_byte != b'\n':
+        count += 1
+    return count
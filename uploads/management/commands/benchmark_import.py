@@ -0,0 +1,85 @@
+import csv
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from uploads.mapping import ColumnMapping
+from uploads.tasks import process_product_batch, resolve_import_engine
+
+
+class Command(BaseCommand):
+    help = 'Compare import engine throughput (rows/sec) on the same CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path to the CSV file to import')
+        parser.add_argument(
+            '--engine', action='append', dest='engines',
+            help='Engine to benchmark (repeatable, default: orm, upsert and copy)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Commit the imported rows instead of rolling each run back'
+        )
+
+    def handle(self, *args, **options):
+        engines = options['engines'] or ['orm', 'upsert', 'copy']
+        batches = self.load_batches(options['csv_file'], options['batch_size'])
+        total = sum(len(batch) for batch in batches)
+        self.stdout.write(f"Loaded {total} valid rows in {len(batches)} batches")
+
+        for requested in engines:
+            engine = resolve_import_engine(requested)
+            if engine != requested:
+                self.stdout.write(self.style.WARNING(f"Skipping {requested}: not available on this database"))
+                continue
+
+            # Each run starts from the same table state so the engines are
+            # compared on identical work.
+            with transaction.atomic():
+                started_at = time.monotonic()
+                for batch in batches:
+                    process_product_batch(batch, upload_id=None, engine=engine)
+                elapsed = time.monotonic() - started_at
+                if not options['keep']:
+                    transaction.set_rollback(True)
+
+            rate = total / elapsed if elapsed > 0 else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"{engine:>8}: {total} rows in {elapsed:.2f}s ({rate:.0f} rows/sec)"
+            ))
+
+    def load_batches(self, file_path, batch_size):
+        """
+        Parse the file once so every engine writes exactly the same rows
+        """
+        try:
+            csvfile = open(file_path, 'r', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f"Cannot open {file_path}: {e}")
+
+        batches = []
+        batch = []
+        with csvfile:
+            sample = csvfile.read(1024)
+            csvfile.seek(0)
+            delimiter = csv.Sniffer().sniff(sample).delimiter
+
+            reader = csv.reader(csvfile, delimiter=delimiter)
+            extract = ColumnMapping.from_header(next(reader, [])).extract
+            for row in reader:
+                sku, name, description = extract(row)
+                if not sku or not name:
+                    continue
+                batch.append({
+                    'sku': sku,
+                    'name': name,
+                    'description': description,
+                    'is_active': True
+                })
+                if len(batch) >= batch_size:
+                    batches.append(batch)
+                    batch = []
+
+        if batch:
+            batches.append(batch)
+        return batches
@@ -0,0 +1,78 @@
+import csv
+import os
+import sys
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from uploads.mapping import ColumnMapping
+from uploads.tasks import extract_product_data
+
+
+class Command(BaseCommand):
+    help = 'Compare per-row CSV parsing: DictReader + extract_product_data vs the compiled column mapping'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', nargs='?', help='CSV file to parse (default: generate one)')
+        parser.add_argument('--rows', type=int, default=1000000, help='Rows to generate when no file is given')
+
+    def handle(self, *args, **options):
+        file_path = options['csv_file']
+        generated = file_path is None
+        if generated:
+            file_path = self.generate_file(options['rows'])
+
+        try:
+            legacy = self.run(file_path, self.parse_legacy)
+            compiled = self.run(file_path, self.parse_compiled)
+        finally:
+            if generated:
+                os.remove(file_path)
+
+        for label, (rows, cpu, wall, row_bytes) in (('dictreader', legacy), ('compiled', compiled)):
+            rate = rows / wall if wall > 0 else 0
+            self.stdout.write(
+                f"{label:>10}: {rows} rows, {cpu:.2f}s CPU, {rate:.0f} rows/sec, "
+                f"{row_bytes} bytes per row container"
+            )
+        if compiled[1] > 0:
+            self.stdout.write(self.style.SUCCESS(f"CPU speedup: {legacy[1] / compiled[1]:.2f}x"))
+
+    def run(self, file_path, parse):
+        with open(file_path, 'r', encoding='utf-8') as csvfile:
+            started_cpu = time.process_time()
+            started_wall = time.monotonic()
+            rows, row_bytes = parse(csvfile)
+            return rows, time.process_time() - started_cpu, time.monotonic() - started_wall, row_bytes
+
+    def parse_legacy(self, csvfile):
+        rows = 0
+        row_bytes = 0
+        for row in csv.DictReader(csvfile):
+            sku, name, description = extract_product_data(row)
+            if sku and name:
+                sku = sku.upper()
+            rows += 1
+            row_bytes = row_bytes or sys.getsizeof(row)
+        return rows, row_bytes
+
+    def parse_compiled(self, csvfile):
+        rows = 0
+        row_bytes = 0
+        reader = csv.reader(csvfile)
+        extract = ColumnMapping.from_header(next(reader, [])).extract
+        for row in reader:
+            sku, name, description = extract(row)
+            rows += 1
+            row_bytes = row_bytes or sys.getsizeof(row)
+        return rows, row_bytes
+
+    def generate_file(self, rows):
+        self.stdout.write(f"Generating {rows} rows...")
+        handle, file_path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['sku', 'name', 'description', 'brand', 'category', 'price'])
+            for i in range(rows):
+                writer.writerow([f'sku-{i:08d}', f'Product {i}', f'Description for product {i}',
+                                 'Acme', 'Widgets', f'{i % 1000}.99'])
+        return file_path
@@ -0,0 +1,130 @@
+"""
+Column mapping for CSV imports.
+
+The header is resolved once per file into fixed column indices, so each row
+is read straight out of the ``csv.reader`` list without building a dict or
+re-matching header names.
+"""
+from operator import itemgetter
+
+# Common field name variations for SKU
+SKU_FIELDS = frozenset(['uniq_id', 'sku', 'product_sku', 'product-id', 'product_id', 'id', 'item_sku', 'pid'])
+# Common field name variations for name
+NAME_FIELDS = frozenset(['product_name', 'name', 'title', 'product-title', 'item_name'])
+# Common field name variations for description
+DESCRIPTION_FIELDS = frozenset(['description', 'desc', 'product_description', 'item_description'])
+
+# Positional fallback for headerless formats: uniq_id is the first column,
+# product_name the 4th and the description the 6th.
+FALLBACK_SKU_INDEX = 0
+FALLBACK_NAME_INDEX = 3
+FALLBACK_DESCRIPTION_INDEX = 5
+
+
+class ColumnMapping:
+    """
+    Fixed column indices for the product fields of one file.
+
+    ``extract`` returns normalized ``(sku, name, description)`` values: the
+    SKU is stripped and uppercased, empty SKU/name come back as ``None``.
+    """
+
+    def __init__(self, sku_index, name_index, description_index=None):
+        self.sku_index = sku_index
+        self.name_index = name_index
+        self.description_index = description_index
+
+        if description_index is None:
+            self._getter = itemgetter(sku_index, name_index)
+            self.extract = self._extract_without_description
+        else:
+            self._getter = itemgetter(sku_index, name_index, description_index)
+            self.extract = self._extract_with_description
+
+    @classmethod
+    def from_header(cls, header):
+        """
+        Detect the product columns from a header row
+        """
+        sku_index = name_index = description_index = None
+
+        # Later matches win, like the per-row lookup this replaces
+        for index, column in enumerate(header):
+            key = column.lower().strip()
+            if key in SKU_FIELDS:
+                sku_index = index
+            elif key in NAME_FIELDS:
+                name_index = index
+            elif key in DESCRIPTION_FIELDS:
+                description_index = index
+
+        if sku_index is None or name_index is None:
+            if sku_index is None:
+                sku_index = FALLBACK_SKU_INDEX
+            if name_index is None:
+                name_index = FALLBACK_NAME_INDEX
+            if description_index is None and len(header) > FALLBACK_DESCRIPTION_INDEX:
+                description_index = FALLBACK_DESCRIPTION_INDEX
+
+        return cls(sku_index, name_index, description_index)
+
+    @classmethod
+    def from_profile(cls, profile, header):
+        """
+        Map columns by the names saved on a MappingProfile, skipping detection
+        """
+        columns = [column.strip() for column in header]
+
+        def index_of(column):
+            try:
+                return columns.index(column)
+            except ValueError:
+                raise ValueError(f"Column '{column}' from mapping profile '{profile.name}' not found in header")
+
+        description_index = index_of(profile.description_column) if profile.description_column else None
+        return cls(index_of(profile.sku_column), index_of(profile.name_column), description_index)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['sku_index'], data['name_index'], data['description_index'])
+
+    def to_dict(self):
+        return {
+            'sku_index': self.sku_index,
+            'name_index': self.name_index,
+            'description_index': self.description_index,
+        }
+
+    def _extract_with_description(self, row):
+        try:
+            sku, name, description = self._getter(row)
+        except IndexError:
+            return self._extract_short_row(row)
+        return sku.strip().upper() or None, name.strip() or None, description.strip()
+
+    def _extract_without_description(self, row):
+        try:
+            sku, name = self._getter(row)
+        except IndexError:
+            return self._extract_short_row(row)
+        return sku.strip().upper() or None, name.strip() or None, ""
+
+    def _extract_short_row(self, row):
+        """
+        Slow path for ragged rows that are missing some of the mapped columns
+        """
+        def value(index):
+            if index is None or index >= len(row):
+                return ""
+            return row[index].strip()
+
+        return value(self.sku_index).upper() or None, value(self.name_index) or None, value(self.description_index)
+
+
+def resolve_column_mapping(header, profile=None):
+    """
+    Build the column mapping for a file from its saved profile or its header
+    """
+    if profile is not None:
+        return ColumnMapping.from_profile(profile, header)
+    return ColumnMapping.from_header(header)
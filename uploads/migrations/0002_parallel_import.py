@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:30
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='chunk_size',
+            field=models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(65536)]),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='import_mode',
+            field=models.CharField(choices=[('serial', 'Serial'), ('parallel', 'Parallel')], default='serial', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='parallelism',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(64)]),
+        ),
+        migrations.CreateModel(
+            name='StagedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.BigIntegerField()),
+                ('sku', models.CharField(max_length=100)),
+                ('name', models.TextField()),
+                ('description', models.TextField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='staged_products', to='uploads.upload')),
+            ],
+            options={
+                'db_table': 'upload_staged_products',
+                'indexes': [models.Index(fields=['upload', 'position'], name='upload_stag_upload__989278_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0002_parallel_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MappingProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('sku_column', models.CharField(max_length=100)),
+                ('name_column', models.CharField(max_length=100)),
+                ('description_column', models.CharField(blank=True, max_length=100)),
+                ('delimiter', models.CharField(blank=True, max_length=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'upload_mapping_profiles',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='mapping_profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploads', to='uploads.mappingprofile'),
+        ),
+    ]
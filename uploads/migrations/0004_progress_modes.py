@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0003_mapping_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='processed_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='progress_mode',
+            field=models.CharField(choices=[('bytes', 'Bytes read'), ('exact', 'Exact row count')], default='bytes', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='total_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0004_progress_modes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('file_name', models.CharField(max_length=255)),
+                ('total_size', models.BigIntegerField(blank=True, null=True)),
+                ('next_chunk', models.IntegerField(default=0)),
+                ('bytes_received', models.BigIntegerField(default=0)),
+                ('checksum', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('finalized', 'Finalized')], default='open', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('upload', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='session', to='uploads.upload')),
+            ],
+            options={
+                'db_table': 'upload_sessions',
+                'indexes': [models.Index(fields=['status'], name='upload_sess_status_f1db9b_idx')],
+            },
+        ),
+    ]
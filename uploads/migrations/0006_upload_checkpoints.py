@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0005_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='checkpoint_offset',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='checkpoint_row',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='resume_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0006_upload_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stagedproduct',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='created_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='unchanged_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='updated_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
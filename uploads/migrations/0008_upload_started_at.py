@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0007_import_outcome_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
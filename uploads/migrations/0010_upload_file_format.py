@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0009_bulk_import_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='file_format',
+            field=models.CharField(choices=[('csv', 'CSV'), ('parquet', 'Parquet'), ('arrow', 'Arrow IPC file'), ('arrow_stream', 'Arrow IPC stream')], default='csv', max_length=20),
+        ),
+    ]
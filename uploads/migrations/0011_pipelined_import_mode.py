@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0010_upload_file_format'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='upload',
+            name='import_mode',
+            field=models.CharField(choices=[('serial', 'Serial'), ('parallel', 'Parallel'), ('pipelined', 'Pipelined'), ('bulk', 'Bulk API')], default='serial', max_length=20),
+        ),
+    ]
@@ -1,5 +1,30 @@
-from django.db import models
+import uuid
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.core.validators import MinValueValidator, MaxValueValidator
+
+
+class MappingProfile(models.Model):
+    """
+    Saved column mapping for a known supplier format.
+
+    Uploads that reference a profile skip header detection and delimiter
+    sniffing and read the named columns directly.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    sku_column = models.CharField(max_length=100)
+    name_column = models.CharField(max_length=100)
+    description_column = models.CharField(max_length=100, blank=True)
+    delimiter = models.CharField(max_length=1, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return self.name
+        
+    class Meta:
+        db_table = 'upload_mapping_profiles'
+        ordering = ['name']
 
 
 class Upload(models.Model):
@@ -10,25 +35,102 @@ class Upload(models.Model):
         ('failed', 'Failed'),
     ]
     
+    PROGRESS_MODE_CHOICES = [
+        ('bytes', 'Bytes read'),
+        ('exact', 'Exact row count'),
+    ]
+    
+    IMPORT_MODE_CHOICES = [
+        ('serial', 'Serial'),
+        ('parallel', 'Parallel'),
+        # Serial parsing, with batches written by background threads
+        ('pipelined', 'Pipelined'),
+        # Rows posted to the bulk product API, staged before the upload is queued
+        ('bulk', 'Bulk API'),
+    ]
+    
+    FILE_FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('parquet', 'Parquet'),
+        ('arrow', 'Arrow IPC file'),
+        ('arrow_stream', 'Arrow IPC stream'),
+    ]
+    
     file = models.FileField(upload_to='uploads/')
+    # Detected from the file's leading bytes when the import starts
+    file_format = models.CharField(max_length=20, choices=FILE_FORMAT_CHOICES, default='csv')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    import_mode = models.CharField(max_length=20, choices=IMPORT_MODE_CHOICES, default='serial')
+    mapping_profile = models.ForeignKey(
+        MappingProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploads'
+    )
+    # Parallel imports: bytes per chunk task and number of chunk tasks in
+    # flight. Empty means the IMPORT_CHUNK_SIZE / IMPORT_PARALLELISM settings.
+    # Pipelined imports: writer threads (default IMPORT_PIPELINE_WRITERS).
+    chunk_size = models.PositiveIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(64 * 1024)]
+    )
+    parallelism = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1), MaxValueValidator(64)]
+    )
+    progress_mode = models.CharField(max_length=10, choices=PROGRESS_MODE_CHOICES, default='bytes')
     total_rows = models.IntegerField(default=0)
     processed_rows = models.IntegerField(default=0)
     failed_rows = models.IntegerField(default=0)
+    total_bytes = models.BigIntegerField(default=0)
+    processed_bytes = models.BigIntegerField(default=0)
+    # Split of the imported products by what the import did to them
+    created_rows = models.IntegerField(default=0)
+    updated_rows = models.IntegerField(default=0)
+    unchanged_rows = models.IntegerField(default=0)
+    # Serial imports: byte offset and row number just past the last
+    # committed batch, where a restarted task resumes.
+    checkpoint_offset = models.BigIntegerField(default=0)
+    checkpoint_row = models.BigIntegerField(default=0)
+    # Times the stalled-upload watchdog has re-queued this upload
+    resume_count = models.PositiveIntegerField(default=0)
+    # When the current import began; products changed since then are
+    # reported in the products_upserted webhook pages
+    started_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     
     def __str__(self):
         return f"Upload {self.id} - {self.status}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get('status')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Cached dashboard counts only change when an upload changes status
+        if self.status != getattr(self, '_saved_status', None):
+            from .stats import invalidate_upload_stats
+            transaction.on_commit(invalidate_upload_stats)
+            self._saved_status = self.status
+    
+    def delete(self, *args, **kwargs):
+        from .stats import invalidate_upload_stats
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(invalidate_upload_stats)
+        return result
         
     @property
     def progress_percentage(self):
-        if self.total_rows > 0:
-            return round((self.processed_rows / self.total_rows) * 100, 2)
-        elif self.status == 'processing':
-            # If we're processing but don't have total_rows yet, show some progress
-            return min(90, max(10, self.processed_rows / 10))  # Show some progress based on processed rows
+        if self.status == 'completed':
+            return 100
+        if self.progress_mode == 'bytes':
+            # Share of the file consumed by the reader so far
+            if self.total_bytes > 0:
+                return round(min(100, (self.processed_bytes / self.total_bytes) * 100), 2)
+        elif self.total_rows > 0:
+            # Share of the exactly counted rows handled so far
+            handled_rows = self.processed_rows + self.failed_rows
+            return round(min(100, (handled_rows / self.total_rows) * 100), 2)
         return 0
         
     class Meta:
@@ -36,4 +138,63 @@ class Upload(models.Model):
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
-        ]
\ No newline at end of file
+        ]
+
+
+class UploadSession(models.Model):
+    """
+    A resumable, chunked file upload in progress.
+
+    Chunks are appended to ``file_name`` in storage strictly in order;
+    ``next_chunk`` and ``bytes_received`` describe the acknowledged prefix
+    a client resumes from. ``checksum`` is a running SHA-256 chain over the
+    chunks: sha256(previous checksum bytes + sha256(chunk)), starting from
+    an empty previous checksum.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('finalized', 'Finalized'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    file_name = models.CharField(max_length=255)
+    total_size = models.BigIntegerField(null=True, blank=True)
+    next_chunk = models.IntegerField(default=0)
+    bytes_received = models.BigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    upload = models.OneToOneField(Upload, on_delete=models.SET_NULL, null=True, blank=True, related_name='session')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Upload session {self.id} - {self.status}"
+        
+    class Meta:
+        db_table = 'upload_sessions'
+        indexes = [
+            models.Index(fields=['status']),
+        ]
+
+
+class StagedProduct(models.Model):
+    """
+    A normalized row parsed by a parallel chunk task, waiting to be merged.
+
+    ``position`` orders rows as they appear in the file so the merge can
+    apply last-row-wins for SKUs repeated across chunks.
+    """
+    upload = models.ForeignKey(Upload, on_delete=models.CASCADE, related_name='staged_products')
+    position = models.BigIntegerField()
+    sku = models.CharField(max_length=100)
+    name = models.TextField()
+    description = models.TextField(blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+    content_hash = models.CharField(max_length=16, blank=True, null=True)
+    
+    class Meta:
+        db_table = 'upload_staged_products'
+        indexes = [
+            models.Index(fields=['upload', 'position']),
+        ]
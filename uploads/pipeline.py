@@ -0,0 +1,253 @@
+"""
+Batch writers for the serial CSV import.
+
+``InlineBatchWriter`` writes each batch as soon as it is parsed, so parsing
+and database writes take turns. ``PipelinedBatchWriter`` overlaps them:
+the parsing thread hands batches to writer threads, each with its own
+database connection, through bounded queues. A full queue blocks the
+parser, which keeps memory bounded to a few batches per writer.
+
+Rows are routed to writers by a hash of their SKU, so all rows for a SKU
+go through one writer in file order and the last row still wins. A
+checkpoint is only reported once every batch up to it has been committed
+by all writers, so a restarted import never skips unwritten rows. If a
+writer dies, whatever it died of stops the parser and is raised from the
+caller's thread; ``close`` also refuses to return while any batch is
+unwritten, so such an import is never marked completed.
+
+Both writers time their stages: how long the parser was busy or waiting
+on writes, and how long each writer was busy or idle. Whichever side is
+busy nearly all the time limits the import's throughput.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# How often a blocked thread checks whether the other side failed
+POLL_INTERVAL = 0.5
+
+
+class InlineBatchWriter:
+    """
+    Write each batch before parsing continues
+    """
+
+    def __init__(self, write, processed_rows=0, outcome=None):
+        self.write = write
+        self.processed_rows = processed_rows
+        self.outcome = Counter(outcome or {})
+        self.rejected_rows = 0
+        self.marker = None
+        self.write_seconds = 0.0
+        self.started_at = time.monotonic()
+
+    def submit(self, rows, **marker):
+        """
+        Write ``rows``; ``marker`` is handed back by ``collect`` once they are committed
+        """
+        started_at = time.monotonic()
+        written = self.write(rows, self.outcome)
+        self.write_seconds += time.monotonic() - started_at
+        self.processed_rows += written
+        self.rejected_rows += len(rows) - written
+        self.marker = marker
+
+    def collect(self):
+        """
+        ``(marker, processed_rows, outcome)`` for everything committed so
+        far, or None if nothing was committed since the last call
+        """
+        if self.marker is None:
+            return None
+        marker, self.marker = self.marker, None
+        return marker, self.processed_rows, Counter(self.outcome)
+
+    def close(self):
+        self.elapsed = time.monotonic() - self.started_at
+        return self.processed_rows, self.outcome
+
+    def abort(self):
+        self.elapsed = time.monotonic() - self.started_at
+
+    def describe_timings(self):
+        parse_seconds = self.elapsed - self.write_seconds
+        return f"parse {parse_seconds:.2f}s, write {self.write_seconds:.2f}s (inline)"
+
+
+class PipelinedBatchWriter:
+    """
+    Write batches on ``writers`` threads while the caller keeps parsing.
+
+    ``write(rows, outcome)`` runs on the writer threads and must return the
+    number of rows written; ``depth`` is the queue length per writer.
+    ``processed_rows`` and ``rejected_rows`` (rows the database refused)
+    only cover the batches ``collect`` has reported.
+    """
+
+    def __init__(self, write, writers, depth, processed_rows=0, outcome=None, name='import'):
+        self.write = write
+        self.processed_rows = processed_rows
+        self.outcome = Counter(outcome or {})
+        self.rejected_rows = 0
+        self.queues = [queue.Queue(maxsize=depth) for _ in range(writers)]
+        self.done = queue.Queue()
+        self.error = None
+        # Batch sequence number -> [partitions still being written, marker,
+        # rows written, outcome, rows submitted]
+        self.pending = {}
+        self.next_sequence = 0
+        self.committed_sequence = 0
+        self.wait_seconds = 0.0
+        self.busy_seconds = [0.0] * writers
+        self.idle_seconds = [0.0] * writers
+        self.started_at = time.monotonic()
+        self.threads = [
+            threading.Thread(target=self._run, args=(index,), name=f"{name}-writer-{index}", daemon=True)
+            for index in range(writers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, rows, **marker):
+        """
+        Queue ``rows`` for writing, blocking while the writers are behind
+        """
+        writers = len(self.queues)
+        if writers == 1:
+            partitions = [rows]
+        else:
+            partitions = [[] for _ in range(writers)]
+            for row in rows:
+                partitions[hash(row['sku']) % writers].append(row)
+
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        self.pending[sequence] = [sum(1 for partition in partitions if partition), marker, 0, Counter(), len(rows)]
+        for index, partition in enumerate(partitions):
+            if partition:
+                self._put(index, (sequence, partition))
+
+    def _put(self, index, item):
+        started_at = time.monotonic()
+        try:
+            while True:
+                self._raise_error()
+                if not self.threads[index].is_alive():
+                    raise RuntimeError(f"Import writer {index} stopped")
+                try:
+                    self.queues[index].put(item, timeout=POLL_INTERVAL)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            self.wait_seconds += time.monotonic() - started_at
+
+    def _raise_error(self):
+        if self.error is None:
+            return
+        if not isinstance(self.error, Exception):
+            # Worker shutdown and the like end the task as they would with
+            # inline writes, so the upload resumes from its checkpoint
+            raise self.error
+        raise RuntimeError(f"Import writer failed: {str(self.error)}") from self.error
+
+    def _run(self, index):
+        try:
+            # Once any writer fails the others stop too, leaving their queues
+            while self.error is None:
+                started_at = time.monotonic()
+                try:
+                    item = self.queues[index].get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                finally:
+                    self.idle_seconds[index] += time.monotonic() - started_at
+                if item is None:
+                    break
+
+                sequence, rows = item
+                outcome = Counter()
+                started_at = time.monotonic()
+                try:
+                    written = self.write(rows, outcome)
+                except BaseException as e:
+                    logger.error(f"{threading.current_thread().name} failed: {str(e)}")
+                    self.error = e
+                    break
+                finally:
+                    self.busy_seconds[index] += time.monotonic() - started_at
+                self.done.put((sequence, written, outcome))
+        finally:
+            # Each writer thread has its own connection
+            connection.close()
+
+    def collect(self):
+        """
+        ``(marker, processed_rows, outcome)`` for the longest run of fully
+        committed batches, or None if it has not moved since the last call.
+
+        Counts only cover those batches, so they always match the marker.
+        """
+        self._raise_error()
+        while True:
+            try:
+                sequence, written, outcome = self.done.get_nowait()
+            except queue.Empty:
+                break
+            entry = self.pending[sequence]
+            entry[0] -= 1
+            entry[2] += written
+            entry[3].update(outcome)
+
+        marker = None
+        while self.committed_sequence in self.pending and self.pending[self.committed_sequence][0] == 0:
+            _, marker, written, outcome, submitted = self.pending.pop(self.committed_sequence)
+            self.processed_rows += written
+            self.rejected_rows += submitted - written
+            self.outcome.update(outcome)
+            self.committed_sequence += 1
+        if marker is None:
+            return None
+        return marker, self.processed_rows, Counter(self.outcome)
+
+    def close(self):
+        """
+        Wait for the queued batches to be written; returns the final
+        ``(processed_rows, outcome)``. Raises if any batch was not written.
+        """
+        try:
+            for index in range(len(self.queues)):
+                self._put(index, None)
+        finally:
+            self._join()
+        self._raise_error()
+        self.collect()
+        if self.pending:
+            raise RuntimeError(f"Import writers stopped with {len(self.pending)} batches unwritten")
+        return self.processed_rows, self.outcome
+
+    def abort(self):
+        """
+        Stop the writers without waiting for the queued batches
+        """
+        if self.error is None:
+            self.error = RuntimeError('Import aborted')
+        self._join()
+
+    def _join(self):
+        for thread in self.threads:
+            thread.join()
+        self.elapsed = time.monotonic() - self.started_at
+
+    def describe_timings(self):
+        parse_seconds = self.elapsed - self.wait_seconds
+        writers = ', '.join(
+            f"{busy:.2f}s busy/{idle:.2f}s idle" for busy, idle in zip(self.busy_seconds, self.idle_seconds)
+        )
+        return (f"parse {parse_seconds:.2f}s busy/{self.wait_seconds:.2f}s waiting on writers; "
+                f"writers {writers}")
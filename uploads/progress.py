@@ -0,0 +1,346 @@
+"""
+Live upload progress counters kept in Redis.
+
+Import tasks bump atomic HINCRBY counters in a hash per upload, and the
+progress endpoints read them from there. The counters are copied to the
+``uploads`` row on a time-based throttle and when the import finishes, so
+the hot row is no longer rewritten after every batch.
+"""
+import logging
+import time
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.db.models import F
+from .models import Upload
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ('processed_rows', 'failed_rows', 'processed_bytes', 'created_rows', 'updated_rows', 'unchanged_rows')
+CHECKPOINT_FIELDS = ('checkpoint_offset', 'checkpoint_row')
+
+# Counters outlive a crashed worker long enough to be inspected or resumed
+KEY_TTL = 24 * 60 * 60
+
+_client = None
+
+
+def get_redis():
+    """
+    Shared Redis client for progress counters (the Celery broker instance)
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _client
+
+
+def get_async_redis():
+    """
+    New asyncio Redis client for a streaming connection; close it when done
+    """
+    return aioredis.Redis.from_url(settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+
+
+def progress_key(upload_id):
+    return f"upload:{upload_id}:progress"
+
+
+def flush_lock_key(upload_id):
+    return f"upload:{upload_id}:flushed"
+
+
+def lease_key(upload_id):
+    return f"upload:{upload_id}:lease"
+
+
+def _decode(values):
+    return {key.decode(): int(value) for key, value in values.items()}
+
+
+def get_progress(upload_id):
+    """
+    Return the live counters for an upload, or None if it has none
+    """
+    return get_progress_many([upload_id]).get(upload_id)
+
+
+def get_progress_many(upload_ids):
+    """
+    Fetch live counters for several uploads in one round-trip
+    """
+    if not upload_ids:
+        return {}
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for upload_id in upload_ids:
+            pipe.hgetall(progress_key(upload_id))
+        results = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not read upload progress from Redis: {str(e)}")
+        return {}
+    return {upload_id: _decode(values) for upload_id, values in zip(upload_ids, results) if values}
+
+
+def apply_live_progress(uploads):
+    """
+    Overlay live Redis counters onto in-flight Upload instances
+    """
+    active = [upload for upload in uploads if upload.status == 'processing']
+    progress = get_progress_many([upload.id for upload in active])
+    for upload in active:
+        for field, value in progress.get(upload.id, {}).items():
+            if field in COUNTER_FIELDS:
+                setattr(upload, field, value)
+    return uploads
+
+
+def acquire_lease(upload_id, owner):
+    """
+    Claim an upload for one task run; False if another run holds it.
+
+    The lease expires ``UPLOAD_LEASE_TIMEOUT`` seconds after the last
+    progress update, so a crashed run releases it on its own. The owner
+    that holds it can take it again: a task redelivered after its worker
+    died keeps its id and picks up the dead run's lease.
+    """
+    key = lease_key(upload_id)
+    timeout = settings.UPLOAD_LEASE_TIMEOUT
+    try:
+        r = get_redis()
+        if r.set(key, owner, nx=True, ex=timeout):
+            return True
+        holder = r.get(key)
+        if holder is None or holder.decode() != owner:
+            return False
+        return bool(r.expire(key, timeout))
+    except redis.RedisError as e:
+        # Without Redis there is no broker either, so no competing run
+        logger.warning(f"Could not take the lease for upload {upload_id}: {str(e)}")
+        return True
+
+
+def is_leased(upload_ids):
+    """
+    Return the ids among ``upload_ids`` that a running task currently holds
+    """
+    if not upload_ids:
+        return set()
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for upload_id in upload_ids:
+            pipe.exists(lease_key(upload_id))
+        results = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not read upload leases from Redis: {str(e)}")
+        return set(upload_ids)
+    return {upload_id for upload_id, held in zip(upload_ids, results) if held}
+
+
+def get_checkpoint(upload):
+    """
+    Return where a serial import of ``upload`` can resume, or None.
+
+    The result holds the checkpoint fields and the counters as they were at
+    that checkpoint. The live Redis hash has the latest one; the uploads row
+    has the last one flushed, which is used if Redis lost the hash.
+    """
+    checkpoint = None
+    try:
+        values = get_redis().hgetall(progress_key(upload.id))
+        if values:
+            checkpoint = _decode(values)
+    except redis.RedisError as e:
+        logger.warning(f"Could not read the checkpoint of upload {upload.id} from Redis: {str(e)}")
+
+    if not checkpoint or not checkpoint.get('checkpoint_offset'):
+        checkpoint = {field: getattr(upload, field) for field in (*COUNTER_FIELDS, *CHECKPOINT_FIELDS)}
+    if not checkpoint['checkpoint_offset']:
+        return None
+    return {field: checkpoint.get(field, 0) for field in (*COUNTER_FIELDS, *CHECKPOINT_FIELDS)}
+
+
+class ProgressTracker:
+    """
+    Report the progress of one import task (or one chunk of it).
+
+    ``update`` takes this task's running totals and adds only the change
+    since the last call to the shared counters, so several chunk tasks can
+    report into the same upload. The counters are copied to the database at
+    most once per ``UPLOAD_PROGRESS_FLUSH_INTERVAL`` seconds across all
+    tasks of the upload. If Redis is unreachable, the changes are written to
+    the database directly instead.
+
+    A checkpoint passed to ``update`` is stored with the counters it belongs
+    to, so the two are always flushed to the database together.
+    """
+
+    def __init__(self, upload, flush_interval=None):
+        self.upload = upload
+        self.key = progress_key(upload.id)
+        self.flush_interval = flush_interval or settings.UPLOAD_PROGRESS_FLUSH_INTERVAL
+        self.reported = dict.fromkeys(COUNTER_FIELDS, 0)
+        self.unflushed = dict.fromkeys(COUNTER_FIELDS, 0)
+        self.checkpoint = {}
+        self.use_redis = True
+        self.last_db_flush = time.monotonic()
+
+    def reset(self, **initial):
+        """
+        Start the counters from scratch, optionally at the given values
+        """
+        values = {field: initial.get(field, 0) for field in (*COUNTER_FIELDS, *CHECKPOINT_FIELDS)}
+        self.reported = {field: values[field] for field in COUNTER_FIELDS}
+        values['version'] = 0
+        try:
+            pipe = get_redis().pipeline()
+            pipe.delete(self.key, flush_lock_key(self.upload.id))
+            pipe.hset(self.key, mapping=values)
+            pipe.expire(self.key, KEY_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    def update(self, checkpoint=None, **totals):
+        """
+        Report this task's running totals and flush to the database if due.
+
+        ``checkpoint`` is an optional ``(offset, row)`` pair: the position
+        just past the rows these totals cover, where a restart can resume.
+        """
+        deltas = {}
+        for field, total in totals.items():
+            delta = total - self.reported[field]
+            if delta:
+                deltas[field] = delta
+                self.reported[field] = total
+        if checkpoint is not None:
+            self.checkpoint = dict(zip(CHECKPOINT_FIELDS, checkpoint))
+        if not deltas and checkpoint is None:
+            return
+
+        if self.use_redis:
+            try:
+                pipe = get_redis().pipeline()
+                for field, delta in deltas.items():
+                    pipe.hincrby(self.key, field, delta)
+                if checkpoint is not None:
+                    pipe.hset(self.key, mapping=self.checkpoint)
+                pipe.hincrby(self.key, 'version', 1)
+                pipe.expire(self.key, KEY_TTL)
+                # Progress proves the run is alive, keep its lease
+                pipe.expire(lease_key(self.upload.id), settings.UPLOAD_LEASE_TIMEOUT)
+                pipe.execute()
+            except redis.RedisError as e:
+                self._redis_failed(e)
+
+        if not self.use_redis:
+            for field, delta in deltas.items():
+                self.unflushed[field] += delta
+
+        self.flush()
+
+    def flush(self, force=False):
+        """
+        Copy the counters to the uploads row if the throttle interval passed
+        """
+        if self.use_redis:
+            try:
+                client = get_redis()
+                # Only one task per upload wins the right to flush each interval
+                if not force and not client.set(flush_lock_key(self.upload.id), 1,
+                                                nx=True, ex=max(1, int(self.flush_interval))):
+                    return
+                counters = _decode(client.hgetall(self.key))
+            except redis.RedisError as e:
+                self._redis_failed(e)
+            else:
+                fields = [field for field in (*COUNTER_FIELDS, *CHECKPOINT_FIELDS) if field in counters]
+                for field in fields:
+                    setattr(self.upload, field, counters[field])
+                self.upload.save(update_fields=[*fields, 'updated_at'])
+                return
+
+        self._flush_unflushed(force)
+
+    def finish(self):
+        """
+        Drop the live counters once the final values are in the database
+        """
+        try:
+            get_redis().delete(self.key, flush_lock_key(self.upload.id), lease_key(self.upload.id))
+        except redis.RedisError:
+            pass
+
+    def _flush_unflushed(self, force):
+        """
+        Fallback without Redis: add the accumulated changes with F() updates
+        """
+        if not force and time.monotonic() - self.last_db_flush < self.flush_interval:
+            return
+        changes = {field: F(field) + delta for field, delta in self.unflushed.items() if delta}
+        # The checkpoint is absolute and goes out with the deltas it covers
+        changes.update(self.checkpoint)
+        if changes:
+            Upload.objects.filter(id=self.upload.id).update(**changes)
+        self.unflushed = dict.fromkeys(COUNTER_FIELDS, 0)
+        self.last_db_flush = time.monotonic()
+
+    def _redis_failed(self, error):
+        if self.use_redis:
+            logger.warning(f"Redis unavailable for upload {self.upload.id} progress, writing to the database: {str(error)}")
+        self.use_redis = False
+
+
+class UploadWatcher:
+    """
+    Follow one upload's progress from async views.
+
+    Each ``snapshot`` reads the Redis counters, which is cheap. The uploads
+    row is read only when the counters appear or disappear (the import
+    started or finished), and otherwise at most every
+    ``UPLOAD_EVENTS_DB_INTERVAL`` seconds as a safety net. The returned
+    token changes exactly when something a client would display changes.
+    """
+
+    def __init__(self, upload_id):
+        self.upload_id = upload_id
+        self.client = get_async_redis()
+        self.use_redis = True
+        self.upload = None
+        self.last_db_read = 0
+
+    async def snapshot(self):
+        """
+        Return ``(token, upload)`` with live counters applied.
+
+        Raises Upload.DoesNotExist if the upload is gone.
+        """
+        counters = None
+        if self.use_redis:
+            try:
+                values = await self.client.hgetall(progress_key(self.upload_id))
+                counters = _decode(values) if values else None
+            except redis.RedisError as e:
+                logger.warning(f"Could not read upload progress from Redis: {str(e)}")
+                self.use_redis = False
+
+        since_db_read = time.monotonic() - self.last_db_read
+        state_changed = self.upload is not None and (counters is None) == (self.upload.status == 'processing')
+        if (self.upload is None
+                or (state_changed and since_db_read >= 1)
+                or since_db_read >= settings.UPLOAD_EVENTS_DB_INTERVAL):
+            self.upload = await Upload.objects.aget(id=self.upload_id)
+            self.last_db_read = time.monotonic()
+
+        upload = self.upload
+        if counters and upload.status == 'processing':
+            for field in COUNTER_FIELDS:
+                if field in counters:
+                    setattr(upload, field, counters[field])
+
+        token = f"{upload.status}:{upload.processed_rows}:{upload.failed_rows}:{upload.processed_bytes}"
+        return token, upload
+
+    async def close(self):
+        await self.client.aclose()
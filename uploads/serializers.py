@@ -1,5 +1,12 @@
 from rest_framework import serializers
-from .models import Upload
+from .models import Upload, MappingProfile, UploadSession
+
+
+def validate_file_import_mode(value):
+    # Bulk uploads are only created by the bulk product API
+    if value == 'bulk':
+        raise serializers.ValidationError("Use POST /api/products/bulk/ for bulk imports")
+    return value
 
 
 class UploadSerializer(serializers.ModelSerializer):
@@ -7,7 +14,46 @@ class UploadSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Upload
-        fields = ['id', 'file', 'status', 'total_rows', 'processed_rows', 'failed_rows', 
+        fields = ['id', 'file', 'file_format', 'status', 'import_mode', 'mapping_profile', 'chunk_size', 'parallelism',
+                  'progress_mode', 'total_rows', 'processed_rows', 'failed_rows', 
+                  'total_bytes', 'processed_bytes', 'created_rows', 'updated_rows', 'unchanged_rows',
+                  'checkpoint_offset', 'checkpoint_row', 'resume_count',
                   'progress_percentage', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'status', 'total_rows', 'processed_rows', 'failed_rows', 
-                           'progress_percentage', 'created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['id', 'file_format', 'status', 'total_rows', 'processed_rows', 'failed_rows', 
+                           'total_bytes', 'processed_bytes', 'created_rows', 'updated_rows', 'unchanged_rows',
+                  'checkpoint_offset', 'checkpoint_row', 'resume_count',
+                           'progress_percentage', 'created_at', 'updated_at']
+    
+    def validate_import_mode(self, value):
+        return validate_file_import_mode(value)
+
+
+class MappingProfileSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MappingProfile
+        fields = ['id', 'name', 'sku_column', 'name_column', 'description_column', 'delimiter',
+                  'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'total_size', 'next_chunk', 'bytes_received', 'checksum',
+                  'status', 'upload', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'next_chunk', 'bytes_received', 'checksum',
+                            'status', 'upload', 'created_at', 'updated_at']
+
+
+class UploadSessionFinalizeSerializer(serializers.ModelSerializer):
+    """
+    Import options for the Upload created when a session is finalized
+    """
+    checksum = serializers.CharField(required=False, write_only=True)
+    
+    class Meta:
+        model = Upload
+        fields = ['import_mode', 'mapping_profile', 'chunk_size', 'parallelism', 'progress_mode', 'checksum']
+    
+    def validate_import_mode(self, value):
+        return validate_file_import_mode(value)
\ No newline at end of file
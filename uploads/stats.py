@@ -0,0 +1,52 @@
+"""
+Upload statistics for the dashboard.
+
+All status counts come from one conditional-aggregation query, and the
+result is cached until an upload changes status (or UPLOAD_STATS_CACHE_TTL
+passes, as a safety net for writes that bypass ``Upload.save``).
+"""
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from .models import Upload
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_STATS_CACHE_KEY = 'uploads:stats'
+
+
+def compute_upload_stats():
+    """
+    Count uploads per status in a single query
+    """
+    return Upload.objects.aggregate(
+        total=Count('id'),
+        **{status: Count('id', filter=Q(status=status)) for status, _ in Upload.STATUS_CHOICES},
+    )
+
+
+def get_upload_stats():
+    """
+    Cached upload counts; computed on a miss or when the cache is unreachable
+    """
+    try:
+        stats = cache.get(UPLOAD_STATS_CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"Could not read upload stats from the cache: {str(e)}")
+        return compute_upload_stats()
+    
+    if stats is None:
+        stats = compute_upload_stats()
+        try:
+            cache.set(UPLOAD_STATS_CACHE_KEY, stats, settings.UPLOAD_STATS_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Could not cache upload stats: {str(e)}")
+    return stats
+
+
+def invalidate_upload_stats():
+    try:
+        cache.delete(UPLOAD_STATS_CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached upload stats: {str(e)}")
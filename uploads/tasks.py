@@ -1,38 +1,39 @@
-from celery import shared_task
-from .models import Upload
-from products.models import Product
+from celery import shared_task, chain, chord, group
+from .models import Upload, StagedProduct
+from .columnar import ColumnarReader, detect_file_format
+from .csvio import LineReader, UploadReader, count_csv_records, detect_compression, sniff_delimiter, split_csv_ranges
+from .mapping import ColumnMapping, resolve_column_mapping
+from .pg_copy import copy_product_batch, merge_staged_upload
+from .pipeline import InlineBatchWriter, PipelinedBatchWriter
+from .progress import ProgressTracker, acquire_lease, get_checkpoint, is_leased
+from .stats import invalidate_upload_stats
+from products.models import Product, content_hash
+from webhooks.outbox import enqueue_sku_pages
+from webhooks.subscriptions import has_subscribers
 import csv
 import os
+import time
 import logging
-from django.db import transaction
-from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from collections import Counter
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-
-def estimate_csv_rows(file_path, sample_size=1024):
-    """
-    Efficiently estimate the number of rows in a CSV file
-    """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            # Read a sample of the file
-            sample = f.read(sample_size)
-            # Count newlines in sample
-            newline_count = sample.count('\n')
-            # Get file size
-            file_size = os.path.getsize(file_path)
-            # Estimate total rows
-            estimated_rows = int((file_size / sample_size) * newline_count)
-            return max(1, estimated_rows)  # Ensure at least 1
-    except:
-        return 1000  # Default estimate
+# Upload fields counting what the import did to each product
+OUTCOME_FIELDS = ('created_rows', 'updated_rows', 'unchanged_rows')
 
 
 def extract_product_data(row):
     """
-    Extract product data from a CSV row, handling different possible formats
+    Extract product data from a CSV row, handling different possible formats.
+
+    Imports resolve the header once with ``resolve_column_mapping`` instead;
+    this per-row version is kept for callers that only have a dict row.
     """
     # Default values
     sku = None
@@ -73,19 +74,55 @@ def extract_product_data(row):
     return sku, name, description
 
 
-@shared_task
-def process_csv_upload(upload_id):
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_csv_upload(self, upload_id):
     """
-    Process a CSV upload asynchronously with optimizations for large files
+    Process a CSV upload asynchronously with optimizations for large files.
+
+    The task is acknowledged only once it returns, so a worker killed
+    mid-import gets it re-delivered. Every committed batch records a
+    checkpoint (byte offset and row number); a run that finds the upload
+    still ``processing`` seeks to the checkpoint and continues from there.
+    Re-applying the rows after the checkpoint is harmless because batches
+    are upserts where the last row wins.
     """
     try:
         upload = Upload.objects.get(id=upload_id)
         
-        # Update status to processing immediately with initial values
-        upload.status = 'processing'
-        upload.total_rows = 1000  # Initial estimate to avoid 0% progress
-        upload.processed_rows = 0
-        upload.failed_rows = 0
+        if upload.status == 'completed':
+            return f"Upload {upload_id} is already processed"
+        
+        # Only one run per upload. A redelivered task has the same id and
+        # takes over its crashed run's lease; otherwise the lease lapses on
+        # its own and the watchdog re-queues the upload then.
+        if not acquire_lease(upload_id, self.request.id or 'local'):
+            return f"Upload {upload_id} is being processed by another worker"
+        
+        if upload.import_mode == 'bulk':
+            return import_staged_upload(upload)
+        
+        checkpoint = None
+        if upload.status == 'processing' and upload.import_mode in ('serial', 'pipelined'):
+            checkpoint = get_checkpoint(upload)
+        
+        if checkpoint:
+            logger.info(f"Upload {upload.id}: resuming at row {checkpoint['checkpoint_row']} "
+                        f"(byte {checkpoint['checkpoint_offset']})")
+            for field, value in checkpoint.items():
+                setattr(upload, field, value)
+        else:
+            # Update status to processing immediately with initial values
+            upload.status = 'processing'
+            upload.total_rows = 0
+            upload.processed_rows = 0
+            upload.failed_rows = 0
+            upload.processed_bytes = 0
+            upload.created_rows = 0
+            upload.updated_rows = 0
+            upload.unchanged_rows = 0
+            upload.checkpoint_offset = 0
+            upload.checkpoint_row = 0
+            upload.started_at = timezone.now()
         upload.save()
         
         # Process the CSV file
@@ -96,87 +133,164 @@ def process_csv_upload(upload_id):
             upload.save()
             return f"File not found: {file_path}"
         
-        # Estimate total rows for progress tracking
-        estimated_total_rows = estimate_csv_rows(file_path)
-        upload.total_rows = estimated_total_rows
+        # Progress is measured against the file size, or against an exact
+        # record count when the upload asks for one.
+        upload.total_bytes = os.path.getsize(file_path)
+        upload.file_format = detect_file_format(file_path)
+        if upload.file_format != 'csv':
+            upload.save()
+            return import_columnar_upload(upload, checkpoint)
+        
+        if upload.progress_mode == 'exact':
+            upload.total_rows = max(0, count_csv_records(file_path) - 1)  # minus the header
         upload.save()
         
-        with open(file_path, 'r', encoding='utf-8') as csvfile:
-            # Detect delimiter
-            sample = csvfile.read(1024)
-            csvfile.seek(0)
-            sniffer = csv.Sniffer()
-            delimiter = sniffer.sniff(sample).delimiter
+        if upload.import_mode == 'parallel':
+            with open(file_path, 'rb') as f:
+                compression = detect_compression(f)
+            if compression is not None:
+                # Byte ranges of a compressed file can't be read independently
+                logger.warning(f"Upload {upload.id}: {compression} files can't be split into chunks, importing serially")
+            else:
+                dispatched = start_parallel_import(upload)
+                if dispatched is not None:
+                    return dispatched
+                logger.warning(f"Upload {upload.id}: record boundaries can't be found reliably "
+                               f"(stray quote or ragged rows), importing serially")
+            upload.import_mode = 'serial'
+            upload.save()
+        
+        progress = ProgressTracker(upload)
+        if checkpoint:
+            progress.reset(**checkpoint)
+        else:
+            progress.reset()
+        
+        engine = resolve_import_engine()
+        started_at = time.monotonic()
+        
+        profile = upload.mapping_profile
+        
+        # Compressed files are decompressed as they are read
+        with UploadReader(file_path) as upload_file:
+            csvfile = upload_file.f
+            
+            # Detect delimiter, unless the mapping profile pins it
+            if profile and profile.delimiter:
+                delimiter = profile.delimiter
+            else:
+                delimiter = sniff_delimiter(csvfile)
             
-            reader = csv.DictReader(csvfile, delimiter=delimiter)
+            # The line reader tracks how many bytes the csv reader has consumed
+            lines = LineReader(csvfile)
+            reader = csv.reader(lines, delimiter=delimiter)
             
             # Log the field names to help with debugging
-            fieldnames = reader.fieldnames
+            fieldnames = next(reader, [])
             logger.info(f"CSV field names: {fieldnames}")
             print(f"CSV field names: {fieldnames}")
             
-            processed_count = 0
-            failed_count = 0
+            # Resolve the product columns once for the whole file
+            mapping = resolve_column_mapping(fieldnames, profile)
+            extract = mapping.extract
+            
+            first_row = 0
+            if checkpoint:
+                # Skip everything before the checkpoint without parsing it
+                lines = LineReader(csvfile, start=checkpoint['checkpoint_offset'])
+                reader = csv.reader(lines, delimiter=delimiter)
+                first_row = checkpoint['checkpoint_row']
+            
+            failed_count = upload.failed_rows
             error_details = []
             
             # Batch processing variables
-            batch_size = 1000  # Process 1000 products at a time
+            batch_size = settings.IMPORT_BATCH_SIZE  # Products per write batch
             product_batch = []
             batch_counter = 0
             
-            for i, row in enumerate(reader):
-                try:
-                    # Extract product data from CSV row
-                    sku, name, description = extract_product_data(row)
-                    
-                    # Validate required fields
-                    if not sku:
-                        failed_count += 1
-                        if len(error_details) < 10:  # Only log first 10 errors
-                            error_details.append(f"Row {i+1}: Missing SKU. Row data: {row}")
-                        continue
+            # Batches are written inline, or by writer threads while parsing
+            # goes on in pipelined mode
+            writer = make_batch_writer(upload, engine)
+            try:
+                for i, row in enumerate(reader, first_row):
+                    if not row:
+                        continue  # Blank line
+                    try:
+                        # Extract product data from CSV row
+                        sku, name, description = extract(row)
+                        
+                        # Validate required fields
+                        if not sku:
+                            failed_count += 1
+                            if len(error_details) < 10:  # Only log first 10 errors
+                                error_details.append(f"Row {i+1}: Missing SKU. Row data: {row}")
+                            continue
+                            
+                        if not name:
+                            failed_count += 1
+                            if len(error_details) < 10:  # Only log first 10 errors
+                                error_details.append(f"Row {i+1}: Missing name. Row data: {row}")
+                            continue
+                            
+                        # Add to batch (the SKU is already uppercased)
+                        product_batch.append({
+                            'sku': sku,
+                            'name': name,
+                            'description': description,
+                            'is_active': True
+                        })
                         
-                    if not name:
+                    except Exception as e:
                         failed_count += 1
                         if len(error_details) < 10:  # Only log first 10 errors
-                            error_details.append(f"Row {i+1}: Missing name. Row data: {row}")
+                            error_details.append(f"Row {i+1}: Exception - {str(e)}. Row data: {row}")
                         continue
-                        
-                    # Add to batch
-                    product_batch.append({
-                        'sku': sku.upper(),  # Store as uppercase
-                        'name': name,
-                        'description': description,
-                        'is_active': True
-                    })
                     
                     # When batch is full, process it
                     if len(product_batch) >= batch_size:
-                        processed_in_batch = process_product_batch(product_batch, upload.id)
-                        processed_count += processed_in_batch
+                        # The counters travel with the resume point, so the
+                        # checkpoint only moves once this batch is committed
+                        writer.submit(
+                            product_batch,
+                            checkpoint=(lines.offset, i + 1),
+                            failed_rows=failed_count,
+                            processed_bytes=upload_file.stored_offset(lines.offset),
+                        )
                         product_batch = []  # Reset batch
                         
-                        # Update progress
-                        upload.refresh_from_db()  # Get latest data from DB
-                        upload.processed_rows = processed_count
-                        upload.failed_rows = failed_count
-                        upload.save()
+                        # Update the live counters and the resume point; they
+                        # reach the DB on a throttle
+                        committed = writer.collect()
+                        if committed:
+                            marker, processed_count, outcome = committed
+                            # Rows the database rejected count as failed, as
+                            # in the columnar import
+                            marker['failed_rows'] += writer.rejected_rows
+                            progress.update(processed_rows=processed_count, **marker, **outcome)
                         
                         batch_counter += 1
                         # Log progress every 10 batches
                         if batch_counter % 10 == 0:
-                            logger.info(f"Processed {batch_counter} batches, {processed_count} products so far")
+                            logger.info(f"Parsed {batch_counter} batches, {writer.processed_rows} products written so far")
                     
-                except Exception as e:
-                    failed_count += 1
-                    if len(error_details) < 10:  # Only log first 10 errors
-                        error_details.append(f"Row {i+1}: Exception - {str(e)}. Row data: {row}")
-                    continue
-                
-            # Process remaining products in the final batch
-            if product_batch:
-                processed_in_batch = process_product_batch(product_batch, upload.id)
-                processed_count += processed_in_batch
+                # Process remaining products in the final batch
+                if product_batch:
+                    writer.submit(product_batch)
+                processed_count, outcome = writer.close()
+                failed_count += writer.rejected_rows
+            except BaseException:
+                writer.abort()
+                raise
+            
+            elapsed = time.monotonic() - started_at
+            rows_per_second = processed_count / elapsed if elapsed > 0 else 0
+            logger.info(
+                f"Upload {upload.id}: imported {processed_count} products in {elapsed:.2f}s "
+                f"({rows_per_second:.0f} rows/sec) using the {engine} engine: {outcome['created_rows']} created, "
+                f"{outcome['updated_rows']} updated, {outcome['unchanged_rows']} unchanged"
+            )
+            logger.info(f"Upload {upload.id}: stage timings: {writer.describe_timings()}")
                 
             # Log error details if there were failures
             if error_details:
@@ -185,12 +299,17 @@ def process_csv_upload(upload_id):
                 print(error_summary)
             
             # Final update with actual counts
-            upload.refresh_from_db()  # Get latest data from DB
             upload.processed_rows = processed_count
             upload.failed_rows = failed_count
             upload.total_rows = processed_count + failed_count
+            upload.processed_bytes = upload.total_bytes
+            for field in OUTCOME_FIELDS:
+                setattr(upload, field, outcome[field])
             upload.status = 'completed'
-            upload.save()
+            with transaction.atomic():
+                upload.save()
+                enqueue_upserted_events(upload)
+            progress.finish()
             
             return f"Processed {processed_count} products, {failed_count} failed"
             
@@ -202,61 +321,593 @@ def process_csv_upload(upload_id):
             upload = Upload.objects.get(id=upload_id)
             upload.status = 'failed'
             upload.save()
+            ProgressTracker(upload).finish()
         except:
             pass
         return f"Failed to process upload: {str(e)}"
 
 
-def process_product_batch(product_batch, upload_id):
+def make_batch_writer(upload, engine):
     """
-    Process a batch of products using bulk operations for better performance
+    Batch writer for a serial import: ``pipelined`` uploads write on
+    ``parallelism`` (or ``IMPORT_PIPELINE_WRITERS``) threads, the others inline
+    """
+    def write(rows, outcome):
+        return process_product_batch(rows, upload.id, engine, outcome)
+    
+    outcome = {field: getattr(upload, field) for field in OUTCOME_FIELDS}
+    if upload.import_mode != 'pipelined':
+        return InlineBatchWriter(write, upload.processed_rows, outcome)
+    
+    writers = upload.parallelism or settings.IMPORT_PIPELINE_WRITERS
+    if connection.vendor == 'sqlite':
+        # SQLite takes one writer at a time; more threads only contend for the lock
+        writers = 1
+    return PipelinedBatchWriter(
+        write, writers, settings.IMPORT_PIPELINE_DEPTH,
+        upload.processed_rows, outcome, name=f"upload-{upload.id}"
+    )
+
+
+def import_columnar_upload(upload, checkpoint=None):
+    """
+    Import a Parquet or Arrow upload, one record batch at a time.
+
+    Batches are normalized with vectorized column operations and go
+    straight to ``process_product_batch``. The row count comes from the
+    file metadata, so ``total_rows`` is exact whatever the progress mode.
+    Checkpoints record the row reached; a restart skips the rows before it.
+    Columnar files are always imported by a single task.
+    """
+    if upload.import_mode == 'parallel':
+        upload.import_mode = 'serial'
+        upload.save()
+    
+    progress = ProgressTracker(upload)
+    if checkpoint:
+        progress.reset(**checkpoint)
+    else:
+        progress.reset()
+    
+    engine = resolve_import_engine()
+    started_at = time.monotonic()
+    first_row = checkpoint['checkpoint_row'] if checkpoint else 0
+    processed_count = upload.processed_rows
+    failed_count = upload.failed_rows
+    outcome = Counter({field: getattr(upload, field) for field in OUTCOME_FIELDS})
+    
+    with ColumnarReader(upload.file.path, upload.file_format, upload.mapping_profile) as reader:
+        logger.info(f"Upload {upload.id}: reading {upload.file_format} columns {reader.columns}")
+        if reader.total_rows is not None:
+            upload.total_rows = reader.total_rows
+            upload.save()
+        
+        for batch_start, batch in reader.iter_batches(settings.IMPORT_BATCH_SIZE, first_row):
+            rows, failed = reader.normalize(batch)
+            failed_count += failed
+            if rows:
+                processed_in_batch = process_product_batch(rows, upload.id, engine, outcome)
+                processed_count += processed_in_batch
+                failed_count += len(rows) - processed_in_batch
+            
+            position = reader.position
+            progress.update(
+                checkpoint=(max(position, 1), batch_start + len(batch)),
+                processed_rows=processed_count,
+                failed_rows=failed_count,
+                processed_bytes=position,
+                **outcome,
+            )
+    
+    elapsed = time.monotonic() - started_at
+    rows_per_second = processed_count / elapsed if elapsed > 0 else 0
+    logger.info(
+        f"Upload {upload.id}: imported {processed_count} products from {upload.file_format} in {elapsed:.2f}s "
+        f"({rows_per_second:.0f} rows/sec) using the {engine} engine: {outcome['created_rows']} created, "
+        f"{outcome['updated_rows']} updated, {outcome['unchanged_rows']} unchanged"
+    )
+    
+    upload.processed_rows = processed_count
+    upload.failed_rows = failed_count
+    upload.total_rows = processed_count + failed_count
+    upload.processed_bytes = upload.total_bytes
+    for field in OUTCOME_FIELDS:
+        setattr(upload, field, outcome[field])
+    upload.status = 'completed'
+    with transaction.atomic():
+        upload.save()
+        enqueue_upserted_events(upload)
+    progress.finish()
+    
+    return f"Processed {processed_count} products, {failed_count} failed"
+
+
+@shared_task
+def requeue_stalled_uploads():
+    """
+    Re-queue uploads whose import died with its worker.
+
+    An upload is stalled when it has been processing for
+    ``UPLOAD_STALL_TIMEOUT`` seconds without a database update and no run
+    holds its lease. Pending uploads are left alone: with a single worker
+    they routinely wait in the queue behind a long import. Serial imports resume from their checkpoint, parallel
+    ones are re-dispatched. After ``UPLOAD_MAX_RESUMES`` attempts the upload
+    is marked failed instead, so a file that keeps crashing workers stops
+    being retried.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_STALL_TIMEOUT)
+    stalled = list(Upload.objects.filter(status='processing', updated_at__lt=cutoff)
+                   .values_list('id', 'resume_count'))
+    leased = is_leased([upload_id for upload_id, _ in stalled])
+    
+    requeued = 0
+    for upload_id, resume_count in stalled:
+        if upload_id in leased:
+            continue
+        if resume_count >= settings.UPLOAD_MAX_RESUMES:
+            logger.error(f"Upload {upload_id} stalled after {resume_count} resumes, marking it failed")
+            Upload.objects.filter(id=upload_id).update(status='failed', updated_at=timezone.now())
+            invalidate_upload_stats()
+            continue
+        
+        logger.warning(f"Upload {upload_id} stalled, re-queueing it (resume {resume_count + 1})")
+        # Touching updated_at gives the new run a full timeout to start
+        Upload.objects.filter(id=upload_id).update(resume_count=F('resume_count') + 1, updated_at=timezone.now())
+        process_csv_upload.delay(upload_id)
+        requeued += 1
+    
+    return f"Re-queued {requeued} stalled uploads"
+
+
+# Chunk row positions are (chunk_index << CHUNK_POSITION_BITS) + row index,
+# which orders rows exactly as they appear in the file.
+CHUNK_POSITION_BITS = 32
+
+
+def start_parallel_import(upload):
+    """
+    Split an upload into record-aligned byte ranges and fan them out.
+
+    The ranges are dealt round-robin into ``parallelism`` lanes. Each lane
+    is a chain of chunk tasks, so at most ``parallelism`` chunks run at once,
+    and a chord merges the staged rows once every lane has finished.
+    Returns None, dispatching nothing, when the file can't be split safely.
     """
+    file_path = upload.file.path
+    chunk_size = upload.chunk_size or settings.IMPORT_CHUNK_SIZE
+    parallelism = upload.parallelism or settings.IMPORT_PARALLELISM
+    
+    profile = upload.mapping_profile
+    
+    with open(file_path, 'rb') as f:
+        delimiter = profile.delimiter if profile and profile.delimiter else sniff_delimiter(f)
+        lines = LineReader(f)
+        fieldnames = next(csv.reader(lines, delimiter=delimiter), [])
+        header_end = lines.offset
+    
+    mapping = resolve_column_mapping(fieldnames, profile).to_dict()
+    
+    ranges = split_csv_ranges(file_path, chunk_size, start=header_end, delimiter=delimiter, columns=len(fieldnames))
+    if ranges is None:
+        return None
+    logger.info(f"Upload {upload.id}: split into {len(ranges)} chunks across {parallelism} lanes")
+    
+    if not ranges:
+        upload.total_rows = 0
+        upload.processed_bytes = upload.total_bytes
+        upload.status = 'completed'
+        upload.save()
+        return "Processed 0 products, 0 failed"
+    
+    upload.processed_bytes = header_end
+    upload.save()
+    ProgressTracker(upload).reset(processed_bytes=header_end)
+    
+    lanes = []
+    for lane_index in range(min(parallelism, len(ranges))):
+        lane = []
+        for chunk_index in range(lane_index, len(ranges), parallelism):
+            start, end = ranges[chunk_index]
+            args = (upload.id, chunk_index, start, end, mapping, delimiter)
+            # The first task of a lane starts a fresh result list, the rest
+            # receive the list accumulated by the previous task in the chain.
+            lane.append(process_csv_chunk.s([], *args) if not lane else process_csv_chunk.s(*args))
+        lanes.append(chain(*lane))
+    
+    chord(group(lanes))(finalize_parallel_upload.s(upload.id))
+    return f"Dispatched {len(ranges)} chunks for upload {upload.id}"
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def process_csv_chunk(results, upload_id, chunk_index, start, end, mapping, delimiter):
+    """
+    Parse one byte range of an upload and stage its rows for the final merge.
+
+    Returns the lane's accumulated list of chunk results with this chunk's
+    ``{'chunk', 'staged', 'failed'}`` counts appended. Errors are reported
+    in the result instead of raised so the chord callback always runs.
+    """
+    chunk_result = {'chunk': chunk_index, 'staged': 0, 'failed': 0}
+    position_base = chunk_index << CHUNK_POSITION_BITS
+    
+    def stage_batch(rows):
+        add_content_hashes(rows)
+        StagedProduct.objects.bulk_create([StagedProduct(upload_id=upload_id, **row) for row in rows])
+    
     try:
-        # Use a more efficient approach: bulk create with conflict resolution
-        # First, get all SKUs in this batch
-        skus_in_batch = [product['sku'] for product in product_batch]
+        # Chunks may be re-delivered, so start from a clean slate
+        StagedProduct.objects.filter(
+            upload_id=upload_id,
+            position__gte=position_base,
+            position__lt=position_base + (1 << CHUNK_POSITION_BITS),
+        ).delete()
         
-        # Find existing products with these SKUs (case-insensitive)
-        existing_products = Product.objects.filter(sku__in=skus_in_batch)
-        existing_sku_dict = {product.sku: product for product in existing_products}
+        upload = Upload.objects.get(id=upload_id)
+        file_path = upload.file.path
+        progress = ProgressTracker(upload)
+        extract = ColumnMapping.from_dict(mapping).extract
+        batch = []
+        batch_size = settings.IMPORT_BATCH_SIZE
         
-        # Separate products to create and update
-        products_to_create = []
-        products_to_update = []
+        with open(file_path, 'rb') as f:
+            lines = LineReader(f, start, end)
+            reader = csv.reader(lines, delimiter=delimiter)
+            for i, row in enumerate(reader):
+                if not row:
+                    continue  # Blank line
+                try:
+                    sku, name, description = extract(row)
+                except Exception:
+                    chunk_result['failed'] += 1
+                    continue
+                
+                if not sku or not name:
+                    chunk_result['failed'] += 1
+                    continue
+                
+                batch.append({
+                    'position': position_base + i,
+                    'sku': sku,
+                    'name': name,
+                    'description': description,
+                    'is_active': True
+                })
+                
+                if len(batch) >= batch_size:
+                    staged = write_batch_bisecting(batch, stage_batch, upload_id)
+                    chunk_result['staged'] += staged
+                    chunk_result['failed'] += len(batch) - staged
+                    batch = []
+                    progress.update(
+                        processed_rows=chunk_result['staged'],
+                        failed_rows=chunk_result['failed'],
+                        processed_bytes=lines.offset - start,
+                    )
         
-        for product_data in product_batch:
-            sku = product_data['sku']
-            if sku in existing_sku_dict:
-                # Update existing product
-                existing_product = existing_sku_dict[sku]
-                existing_product.name = product_data['name']
-                existing_product.description = product_data['description']
-                existing_product.is_active = product_data['is_active']
-                products_to_update.append(existing_product)
-            else:
-                # Create new product
-                products_to_create.append(Product(**product_data))
+        if batch:
+            staged = write_batch_bisecting(batch, stage_batch, upload_id)
+            chunk_result['staged'] += staged
+            chunk_result['failed'] += len(batch) - staged
         
-        # Bulk operations
-        if products_to_create:
-            Product.objects.bulk_create(products_to_create, ignore_conflicts=True)
+        # Live progress while the other chunks are still running; the final
+        # counts are recomputed from the chunk results by the chord callback.
+        progress.update(
+            processed_rows=chunk_result['staged'],
+            failed_rows=chunk_result['failed'],
+            processed_bytes=end - start,
+        )
+    except Exception as e:
+        logger.error(f"Chunk {chunk_index} of upload {upload_id} failed: {str(e)}")
+        chunk_result['error'] = str(e)
+    
+    return results + [chunk_result]
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def finalize_parallel_upload(lane_results, upload_id):
+    """
+    Combine chunk counts and merge staged rows into products in file order
+    """
+    chunk_results = [result for lane in lane_results for result in lane]
+    processed_count = sum(result['staged'] for result in chunk_results)
+    failed_count = sum(result['failed'] for result in chunk_results)
+    errors = [result for result in chunk_results if 'error' in result]
+    
+    try:
+        upload = Upload.objects.get(id=upload_id)
         
-        if products_to_update:
-            Product.objects.bulk_update(products_to_update, ['name', 'description', 'is_active'])
+        if errors:
+            logger.error(f"Upload {upload_id}: {len(errors)} chunks failed: {errors}")
+            upload.status = 'failed'
+        else:
+            outcome = merge_staged_products(upload_id)
+            for field in OUTCOME_FIELDS:
+                setattr(upload, field, outcome[field])
+            upload.status = 'completed'
         
-        return len(product_batch)
+        StagedProduct.objects.filter(upload_id=upload_id).delete()
+        
+        upload.processed_rows = processed_count
+        upload.failed_rows = failed_count
+        upload.total_rows = processed_count + failed_count
+        upload.processed_bytes = upload.total_bytes
+        with transaction.atomic():
+            upload.save()
+            if upload.status == 'completed':
+                enqueue_upserted_events(upload)
+        ProgressTracker(upload).finish()
+        
+        return f"Processed {processed_count} products, {failed_count} failed"
         
     except Exception as e:
-        logger.error(f"Error processing batch for upload {upload_id}: {str(e)}")
-        # If bulk operations fail, fall back to individual processing
-        processed_count = 0
-        for product_data in product_batch:
-            try:
-                Product.objects.update_or_create(
-                    sku__iexact=product_data['sku'],
-                    defaults=product_data
-                )
-                processed_count += 1
-            except Exception as inner_e:
-                logger.error(f"Error processing individual product: {str(inner_e)}")
-        return processed_count
\ No newline at end of file
+        logger.error(f"Failed to finalize upload {upload_id}: {str(e)}")
+        Upload.objects.filter(id=upload_id).update(status='failed')
+        invalidate_upload_stats()
+        return f"Failed to process upload: {str(e)}"
+
+
+def enqueue_upserted_events(upload):
+    """
+    Report the products created or updated since the import started as
+    ``products_upserted`` webhook pages.
+
+    Unchanged rows keep their ``updated_at``, so they are not reported.
+    Products edited through the API while the import ran are included too.
+    The scan walks the ``(updated_at, id)`` index a page at a time.
+    """
+    if upload.started_at is None or not has_subscribers('products_upserted'):
+        return
+    
+    page_size = settings.WEBHOOK_EVENT_PAGE_SIZE
+    changed = Product.objects.filter(updated_at__gte=upload.started_at).order_by('updated_at', 'id')
+    page = 1
+    last = None
+    while True:
+        rows = changed
+        if last is not None:
+            rows = rows.filter(Q(updated_at__gt=last[0]) | Q(updated_at=last[0], id__gt=last[1]))
+        rows = list(rows.values_list('updated_at', 'id', 'sku')[:page_size])
+        if not rows:
+            break
+        page = enqueue_sku_pages('products_upserted', [sku for _, _, sku in rows], page,
+                                 source='upload', upload_id=upload.id)
+        last = rows[-1][:2]
+    logger.info(f"Upload {upload.id}: queued {page - 1} products_upserted pages")
+
+
+def import_staged_upload(upload):
+    """
+    Merge the rows the bulk product API staged for ``upload``.
+
+    The rows were validated and counted when they were staged. Merging is
+    an upsert where the last row wins, so a re-run after a crash simply
+    starts over.
+    """
+    if upload.status != 'processing' or upload.started_at is None:
+        upload.started_at = timezone.now()
+    upload.status = 'processing'
+    upload.save()
+    
+    started_at = time.monotonic()
+    outcome = merge_staged_products(upload.id)
+    StagedProduct.objects.filter(upload_id=upload.id).delete()
+    
+    processed_count = upload.total_rows - upload.failed_rows
+    logger.info(
+        f"Upload {upload.id}: imported {processed_count} products from the bulk API in "
+        f"{time.monotonic() - started_at:.2f}s: {outcome['created_rows']} created, "
+        f"{outcome['updated_rows']} updated, {outcome['unchanged_rows']} unchanged"
+    )
+    
+    upload.processed_rows = processed_count
+    for field in OUTCOME_FIELDS:
+        setattr(upload, field, outcome[field])
+    upload.status = 'completed'
+    with transaction.atomic():
+        upload.save()
+        enqueue_upserted_events(upload)
+    ProgressTracker(upload).finish()
+    
+    return f"Processed {processed_count} products, {upload.failed_rows} failed"
+
+
+def merge_staged_products(upload_id):
+    """
+    Apply staged rows to products; for repeated SKUs the last row in the file wins.
+
+    Returns the created/updated/unchanged counts as a Counter.
+    """
+    engine = resolve_import_engine()
+    if engine == 'copy':
+        with transaction.atomic():
+            return Counter(merge_staged_upload(upload_id))
+    
+    # Feeding batches in file order makes later rows overwrite earlier ones,
+    # and deduping each batch keeps the last occurrence within it.
+    staged = (StagedProduct.objects.filter(upload_id=upload_id)
+              .order_by('position')
+              .values('sku', 'name', 'description', 'is_active', 'content_hash'))
+    outcome = Counter()
+    batch = {}
+    for row in staged.iterator(chunk_size=settings.IMPORT_BATCH_SIZE):
+        batch.pop(row['sku'], None)
+        batch[row['sku']] = row
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            process_product_batch(list(batch.values()), upload_id, engine, outcome)
+            batch = {}
+    if batch:
+        process_product_batch(list(batch.values()), upload_id, engine, outcome)
+    return outcome
+
+
+def resolve_import_engine(engine=None):
+    """
+    Pick the batch write engine for an import.
+
+    'copy' streams batches through a PostgreSQL staging table and needs a
+    PostgreSQL connection; 'upsert' writes each batch with one native
+    INSERT ... ON CONFLICT statement; 'orm' is the legacy read-then-write
+    path. 'auto' picks the fastest one the database supports.
+    """
+    engine = engine or getattr(settings, 'IMPORT_ENGINE', 'auto')
+    is_postgres = connection.vendor == 'postgresql'
+    supports_upsert = connection.features.supports_update_conflicts_with_target
+    
+    if engine == 'auto':
+        if is_postgres:
+            return 'copy'
+        return 'upsert' if supports_upsert else 'orm'
+    if engine == 'copy' and not is_postgres:
+        logger.warning(f"COPY import engine requires PostgreSQL, using the ORM engine on {connection.vendor}")
+        return 'upsert' if supports_upsert else 'orm'
+    if engine == 'upsert' and not supports_upsert:
+        logger.warning(f"Upsert import engine is not supported on {connection.vendor}, using the ORM engine")
+        return 'orm'
+    return engine
+
+
+def add_content_hashes(product_batch):
+    """
+    Fill in the content hash of normalized product rows that lack one
+    """
+    for product_data in product_batch:
+        if product_data.get('content_hash') is None:
+            product_data['content_hash'] = content_hash(
+                product_data['name'], product_data['description'], product_data['is_active']
+            )
+    return product_batch
+
+
+def process_product_batch(product_batch, upload_id, engine='orm', outcome=None):
+    """
+    Write a batch of normalized products with the selected import engine.
+
+    Returns the number of rows written. Rows that the database rejects are
+    isolated by bisecting the batch and are left out of the count. Products
+    whose content hash is unchanged are not rewritten; the created, updated
+    and unchanged counts are added to ``outcome`` when given.
+    """
+    add_content_hashes(product_batch)
+    
+    if engine == 'copy':
+        try:
+            result = copy_product_batch(product_batch)
+        except Exception as e:
+            logger.error(f"COPY load failed for upload {upload_id}, falling back to the upsert engine: {str(e)}")
+            engine = 'upsert' if connection.features.supports_update_conflicts_with_target else 'orm'
+        else:
+            if outcome is not None:
+                outcome.update(result)
+            return len(product_batch)
+    
+    write_batch = upsert_product_batch if engine == 'upsert' else orm_product_batch
+    return write_batch_bisecting(product_batch, write_batch, upload_id, outcome)
+
+
+def write_batch_bisecting(product_batch, write_batch, upload_id, outcome=None):
+    """
+    Write a batch in one go, splitting it in halves on failure.
+
+    A batch with k bad rows costs O(k log n) statements instead of one query
+    per row. Each attempt runs in its own savepoint so a failed statement
+    doesn't poison the surrounding transaction. Counts returned by
+    ``write_batch`` for successful attempts are added to ``outcome``.
+    """
+    try:
+        with transaction.atomic():
+            result = write_batch(product_batch)
+    except Exception as e:
+        if len(product_batch) == 1:
+            logger.error(f"Rejected product {product_batch[0]['sku']} for upload {upload_id}: {str(e)}")
+            return 0
+    else:
+        if outcome is not None and result:
+            outcome.update(result)
+        return len(product_batch)
+    
+    middle = len(product_batch) // 2
+    return (write_batch_bisecting(product_batch[:middle], write_batch, upload_id, outcome) +
+            write_batch_bisecting(product_batch[middle:], write_batch, upload_id, outcome))
+
+
+def upsert_product_batch(product_batch):
+    """
+    Insert or update the changed products of a batch with a single INSERT ... ON CONFLICT
+    """
+    # Keep the last row for each SKU, a single upsert statement cannot
+    # touch the same row twice.
+    latest = {product_data['sku']: product_data for product_data in product_batch}
+    
+    # One indexed lookup tells new, changed and unchanged products apart
+    stored_hashes = dict(Product.objects.filter(sku__in=latest).values_list('sku', 'content_hash'))
+    changed = [product_data for sku, product_data in latest.items()
+               if sku not in stored_hashes or stored_hashes[sku] != product_data['content_hash']]
+    
+    if changed:
+        Product.objects.bulk_create(
+            [Product(**product_data) for product_data in changed],
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=['name', 'description', 'is_active', 'content_hash', 'updated_at'],
+        )
+    
+    created = sum(1 for product_data in changed if product_data['sku'] not in stored_hashes)
+    return {
+        'created_rows': created,
+        'updated_rows': len(changed) - created,
+        'unchanged_rows': len(latest) - len(changed),
+    }
+
+
+def orm_product_batch(product_batch):
+    """
+    Process a batch of products using bulk operations for better performance
+    """
+    # First, get all SKUs in this batch
+    skus_in_batch = [product['sku'] for product in product_batch]
+    
+    # Find existing products with these SKUs
+    existing_products = Product.objects.filter(sku__in=skus_in_batch)
+    existing_sku_dict = {product.sku: product for product in existing_products}
+    
+    # Separate products to create and update; products whose content hash
+    # matches are left alone
+    products_to_create = {}
+    products_to_update = {}
+    unchanged_skus = set()
+    now = timezone.now()
+    
+    for product_data in product_batch:
+        sku = product_data['sku']
+        if sku in existing_sku_dict:
+            existing_product = existing_sku_dict[sku]
+            if existing_product.content_hash == product_data['content_hash']:
+                if sku not in products_to_update:
+                    unchanged_skus.add(sku)
+                continue
+            # Update existing product
+            unchanged_skus.discard(sku)
+            existing_product.name = product_data['name']
+            existing_product.description = product_data['description']
+            existing_product.is_active = product_data['is_active']
+            existing_product.content_hash = product_data['content_hash']
+            existing_product.updated_at = now
+            products_to_update[sku] = existing_product
+        else:
+            # Create new product
+            products_to_create[sku] = Product(**product_data)
+    
+    # Bulk operations
+    if products_to_create:
+        Product.objects.bulk_create(products_to_create.values(), ignore_conflicts=True)
+    
+    if products_to_update:
+        Product.objects.bulk_update(
+            products_to_update.values(), ['name', 'description', 'is_active', 'content_hash', 'updated_at']
+        )
+    
+    return {
+        'created_rows': len(products_to_create),
+        'updated_rows': len(products_to_update),
+        'unchanged_rows': len(unchanged_skus),
+    }
@@ -1,3 +1,256 @@
-from django.test import TestCase
+import bz2
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from product_importer.celery import app
+from products.models import Product
+from . import tasks
+from .csvio import LineReader, count_csv_records, split_csv_ranges
+from .models import Upload
 
-# Create your tests here.
+HEADER = ['sku', 'name', 'description']
+
+
+class CSVSplitTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_csv(self, rows, name='products.csv', stray=None):
+        """
+        Write ``rows``; ``stray`` replaces the name of row 100 unquoted, as
+        csv.writer would quote it
+        """
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(rows)
+        if stray:
+            with open(path, 'rb') as f:
+                content = f.read()
+            with open(path, 'wb') as f:
+                f.write(content.replace(b',Product 100,', b',' + stray.encode() + b','))
+        return path
+
+    def parse(self, path):
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.reader(f))
+
+    def parse_ranges(self, path, ranges):
+        records = []
+        with open(path, 'rb') as f:
+            for start, end in ranges:
+                records.extend(csv.reader(LineReader(f, start, end)))
+        return records
+
+    def header_end(self, path):
+        with open(path, 'rb') as f:
+            return len(f.readline())
+
+    def tricky_rows(self, count=5000):
+        # Multiline descriptions and escaped quotes, in quoted fields
+        return [
+            [f"SKU-{i}", f"Product {i}", f'desc\nline "{i}"\n\nend' if i % 3 else f"plain {i}"]
+            for i in range(count)
+        ]
+
+    def test_split_keeps_quoted_newlines_and_escaped_quotes_intact(self):
+        path = self.write_csv(self.tricky_rows())
+        ranges = split_csv_ranges(path, 10000, start=self.header_end(path), columns=len(HEADER))
+        self.assertGreater(len(ranges), 10)
+        self.assertEqual(self.parse_ranges(path, ranges), self.parse(path)[1:])
+
+    def test_split_gives_up_on_a_stray_quote(self):
+        path = self.write_csv(self.tricky_rows(), stray='TV 55" LED')
+        self.assertIsNone(split_csv_ranges(path, 10000, start=self.header_end(path), columns=len(HEADER)))
+
+    def test_split_gives_up_when_a_boundary_lands_inside_a_field(self):
+        # This stray quote looks like the end of a quoted field, so only
+        # the column count of the record after a boundary gives it away
+        path = self.write_csv(self.tricky_rows(), stray='Screen 55"')
+        self.assertIsNone(split_csv_ranges(path, 10000, start=self.header_end(path), columns=len(HEADER)))
+
+    def test_count_matches_csv_reader(self):
+        for name, stray in (('clean.csv', None), ('stray.csv', 'TV 55" LED')):
+            path = self.write_csv(self.tricky_rows(2000), name, stray)
+            self.assertEqual(count_csv_records(path, block_size=4096), len(self.parse(path)), name)
+
+    def test_count_without_trailing_newline(self):
+        path = os.path.join(self.directory, 'short.csv')
+        with open(path, 'wb') as f:
+            f.write(b'sku,name\nA,"x\ny"\nB,z')
+        self.assertEqual(count_csv_records(path), 3)
+
+
+class WorkerCrash(BaseException):
+    """
+    Stands in for a worker dying mid-import
+    """
+
+
+def import_csv_content(rows):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(HEADER)
+    writer.writerows(rows)
+    return output.getvalue().encode('utf-8')
+
+
+# Flush progress and checkpoints to the database on every batch
+@override_settings(IMPORT_BATCH_SIZE=100, IMPORT_CHUNK_SIZE=4096, UPLOAD_PROGRESS_FLUSH_INTERVAL=1e-6,
+                   MEDIA_ROOT=tempfile.gettempdir())
+class ImportTests(TransactionTestCase):
+    def setUp(self):
+        # Run the parallel import's chunk tasks and chord in-process
+        always_eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', always_eager)
+
+        # SKUs repeat, so the last row for each must win in every mode
+        rows = [[f"sku-{i % 700}", f"Product {i}", f'Line one\nline "{i}"' if i % 5 else ''] for i in range(2000)]
+        rows[10] = ['', 'No SKU', '']
+        self.content = import_csv_content(rows)
+        self.expected = {}
+        for sku, name, description in rows:
+            if sku:
+                self.expected[sku.upper()] = (name, description)
+
+    def create_upload(self, content=None, name='products.csv', **fields):
+        upload = Upload(**fields)
+        upload.file.save(name, ContentFile(self.content if content is None else content))
+        self.addCleanup(upload.file.delete, save=False)
+        return upload
+
+    def run_import(self, upload):
+        tasks.process_csv_upload(upload.id)
+        upload.refresh_from_db()
+        return upload
+
+    def products(self):
+        return {sku: (name, description) for sku, name, description
+                in Product.objects.values_list('sku', 'name', 'description')}
+
+    def assert_imported(self, upload):
+        self.assertEqual(upload.status, 'completed')
+        self.assertEqual(upload.processed_rows, 1999)
+        self.assertEqual(upload.failed_rows, 1)
+        self.assertEqual(self.products(), self.expected)
+
+    def test_import_modes_give_the_same_result(self):
+        for import_mode in ('serial', 'pipelined', 'parallel'):
+            with self.subTest(import_mode=import_mode):
+                Product.objects.all().delete()
+                upload = self.run_import(self.create_upload(import_mode=import_mode))
+                self.assertEqual(upload.import_mode, import_mode)
+                self.assert_imported(upload)
+
+    def test_parallel_import_of_a_file_with_a_stray_quote_runs_serially(self):
+        # Row 1999 is the last one for its SKU
+        content = self.content.replace(b',Product 1999,', b',TV 55" LED,')
+        self.expected['SKU-599'] = ('TV 55" LED', self.expected['SKU-599'][1])
+        upload = self.run_import(self.create_upload(content, import_mode='parallel'))
+        self.assertEqual(upload.import_mode, 'serial')
+        self.assert_imported(upload)
+
+    def test_resume_from_checkpoint_after_a_crash(self):
+        for import_mode in ('serial', 'pipelined'):
+            with self.subTest(import_mode=import_mode):
+                Product.objects.all().delete()
+                upload = self.create_upload(import_mode=import_mode)
+                write = tasks.process_product_batch
+                calls = []
+
+                def crash_on_tenth_batch(*args, **kwargs):
+                    calls.append(1)
+                    if len(calls) == 10:
+                        raise WorkerCrash()
+                    return write(*args, **kwargs)
+
+                with mock.patch.object(tasks, 'process_product_batch', crash_on_tenth_batch), \
+                        self.assertRaises(WorkerCrash):
+                    self.run_import(upload)
+                upload.refresh_from_db()
+                self.assertEqual(upload.status, 'processing')
+                self.assertGreater(upload.checkpoint_row, 0)
+                self.assertLess(upload.checkpoint_row, 2000)
+
+                with mock.patch.object(tasks, 'process_product_batch', wraps=write) as resumed:
+                    upload = self.run_import(upload)
+                self.assert_imported(upload)
+                # Only the batches after the checkpoint are written again
+                self.assertLess(resumed.call_count, 20)
+
+    def test_compressed_uploads(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as f:
+            f.writestr('products.csv', self.content)
+        compressed = {
+            'gzip': gzip.compress(self.content),
+            'bz2': bz2.compress(self.content),
+            'zip': archive.getvalue(),
+        }
+        for compression, content in compressed.items():
+            with self.subTest(compression=compression):
+                Product.objects.all().delete()
+                upload = self.run_import(self.create_upload(content, name=f"products.{compression}",
+                                                            import_mode='parallel', progress_mode='exact'))
+                self.assertEqual(upload.import_mode, 'serial')
+                self.assertEqual(upload.total_rows, 2000)
+                self.assert_imported(upload)
+
+
+class UploadEventsTests(TransactionTestCase):
+    def setUp(self):
+        self.upload = Upload.objects.create(file='products.csv', status='completed', processed_rows=5)
+
+    def test_wsgi_gets_a_single_event(self):
+        response = self.client.get(f'/api/uploads/{self.upload.id}/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('retry: '))
+        self.assertIn('event: progress', body)
+        self.assertIn('"processed_rows": 5', body)
+
+    async def test_asgi_gets_a_stream(self):
+        response = await self.async_client.get(f'/api/uploads/{self.upload.id}/events/')
+        self.assertTrue(response.streaming)
+        events = [event async for event in response.streaming_content]
+        # A finished upload ends the stream after its one event
+        self.assertEqual(len(events), 1)
+        self.assertIn(b'"status": "completed"', events[0])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class UploadSessionTests(TransactionTestCase):
+    def put_chunk(self, session_id, index, data):
+        return self.client.put(f'/api/uploads/sessions/{session_id}/chunks/{index}/', data,
+                               content_type='application/octet-stream')
+
+    def test_chunks_may_not_exceed_the_session_size(self):
+        session = self.client.post('/api/uploads/sessions/', {'filename': 'products.csv', 'total_size': 20}).json()
+        self.assertEqual(self.put_chunk(session['id'], 0, b'sku,name\nA,1\nB,').status_code, 200)
+
+        response = self.put_chunk(session['id'], 1, b'22\nC,3')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json()['bytes_received'], 15)
+
+        # The session is untouched and can still be completed
+        self.assertEqual(self.put_chunk(session['id'], 1, b'22\nC\n').json()['bytes_received'], 20)
+        with mock.patch('uploads.views.process_csv_upload') as process:
+            response = self.client.post(f"/api/uploads/sessions/{session['id']}/finalize/")
+        self.assertEqual(response.status_code, 201, response.content)
+        upload = Upload.objects.get(id=response.json()['id'])
+        self.addCleanup(upload.file.delete, save=False)
+        with upload.file.open('rb') as f:
+            self.assertEqual(f.read(), b'sku,name\nA,1\nB,22\nC\n')
+        process.delay.assert_called_once_with(upload.id)
@@ -1,10 +1,22 @@
 from django.urls import path
-from .views import UploadCreateView, UploadProgressView, ProcessUploadView, upload_stats, recent_uploads
+from .views import (
+    UploadCreateView, UploadProgressView, ProcessUploadView, upload_stats, recent_uploads,
+    MappingProfileListCreateView, MappingProfileRetrieveUpdateDestroyView, upload_events, upload_wait,
+    UploadSessionCreateView, UploadSessionDetailView, UploadSessionChunkView, UploadSessionFinalizeView,
+)
 
 urlpatterns = [
     path('uploads/', UploadCreateView.as_view(), name='upload-create'),
     path('uploads/<int:pk>/', UploadProgressView.as_view(), name='upload-progress'),
+    path('uploads/<int:pk>/events/', upload_events, name='upload-events'),
+    path('uploads/<int:pk>/wait/', upload_wait, name='upload-wait'),
     path('uploads/<int:pk>/process/', ProcessUploadView.as_view(), name='upload-process'),
     path('uploads/stats/', upload_stats, name='upload-stats'),
     path('uploads/recent/', recent_uploads, name='recent-uploads'),
+    path('uploads/sessions/', UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('uploads/sessions/<uuid:pk>/', UploadSessionDetailView.as_view(), name='upload-session-detail'),
+    path('uploads/sessions/<uuid:pk>/chunks/<int:index>/', UploadSessionChunkView.as_view(), name='upload-session-chunk'),
+    path('uploads/sessions/<uuid:pk>/finalize/', UploadSessionFinalizeView.as_view(), name='upload-session-finalize'),
+    path('uploads/mapping-profiles/', MappingProfileListCreateView.as_view(), name='mapping-profile-list-create'),
+    path('uploads/mapping-profiles/<int:pk>/', MappingProfileRetrieveUpdateDestroyView.as_view(), name='mapping-profile-detail'),
 ]
\ No newline at end of file
@@ -1,11 +1,37 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.decorators import api_view
-from .models import Upload
-from .serializers import UploadSerializer
+from .models import Upload, MappingProfile, UploadSession
+from .serializers import (
+    UploadSerializer, MappingProfileSerializer, UploadSessionSerializer, UploadSessionFinalizeSerializer,
+)
 from .tasks import process_csv_upload
+from .progress import apply_live_progress, UploadWatcher
+from .stats import get_upload_stats
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+# Comment lines keep idle SSE connections from being dropped by proxies
+SSE_HEARTBEAT_SECONDS = 15
+
+# How soon EventSource clients reconnect to the one-event responses sent
+# under WSGI
+SSE_WSGI_RETRY_MS = 1000
+
+# Read size when copying a chunk body to disk
+CHUNK_COPY_SIZE = 64 * 1024
 
 
 class UploadCreateView(generics.CreateAPIView):
@@ -25,6 +51,172 @@ class UploadProgressView(generics.RetrieveAPIView):
     queryset = Upload.objects.all()
     serializer_class = UploadSerializer
     
+    def get_object(self):
+        # In-flight counters live in Redis; the row is only flushed periodically
+        upload = super().get_object()
+        apply_live_progress([upload])
+        return upload
+    
+    
+class UploadSessionCreateView(generics.CreateAPIView):
+    """
+    Start a chunked, resumable upload
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    
+    def perform_create(self, serializer):
+        session = serializer.save()
+        session.file_name = f"uploads/sessions/{session.id}.part"
+        os.makedirs(os.path.dirname(default_storage.path(session.file_name)), exist_ok=True)
+        open(default_storage.path(session.file_name), 'wb').close()
+        session.save(update_fields=['file_name'])
+
+
+class UploadSessionDetailView(generics.RetrieveAPIView):
+    """
+    Session state; clients resume from ``next_chunk`` / ``bytes_received``
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+
+
+class UploadSessionChunkView(generics.GenericAPIView):
+    """
+    Append chunk ``index`` to a session.
+
+    The request body is copied to storage in small blocks and hashed as it
+    goes, it is never parsed or held in memory. Chunks must arrive in order,
+    and may not take the session past its ``total_size`` (413).
+    Re-sending an already acknowledged chunk is a no-op, so clients can retry
+    blindly after a dropped connection.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    parser_classes = ()
+    
+    def put(self, request, *args, **kwargs):
+        index = kwargs['index']
+        
+        with transaction.atomic():
+            try:
+                session = UploadSession.objects.select_for_update().get(pk=kwargs['pk'])
+            except UploadSession.DoesNotExist:
+                return Response({'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+            
+            if session.status != 'open':
+                return Response({'error': 'Upload session is already finalized'}, status=status.HTTP_409_CONFLICT)
+            if index < session.next_chunk:
+                return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+            if index > session.next_chunk:
+                return Response({
+                    'error': f'Expected chunk {session.next_chunk}',
+                    'next_chunk': session.next_chunk,
+                    'bytes_received': session.bytes_received,
+                }, status=status.HTTP_409_CONFLICT)
+            
+            # A chunk may not run past the size the session was opened with
+            remaining = None if session.total_size is None else session.total_size - session.bytes_received
+            too_large = Response({
+                'error': f'Chunk exceeds the session size of {session.total_size} bytes',
+                'next_chunk': session.next_chunk,
+                'bytes_received': session.bytes_received,
+            }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            try:
+                content_length = int(request.headers.get('Content-Length') or 0)
+            except ValueError:
+                content_length = 0
+            if remaining is not None and content_length > remaining:
+                return too_large
+            
+            digest = hashlib.sha256()
+            size = 0
+            max_size = settings.UPLOAD_SESSION_MAX_CHUNK_SIZE
+            with open(default_storage.path(session.file_name), 'r+b') as f:
+                # Drop whatever an interrupted attempt at this chunk left behind
+                f.truncate(session.bytes_received)
+                f.seek(session.bytes_received)
+                while True:
+                    block = request.stream.read(CHUNK_COPY_SIZE) if request.stream else b''
+                    if not block:
+                        break
+                    size += len(block)
+                    if size > max_size:
+                        f.truncate(session.bytes_received)
+                        return Response({'error': f'Chunks are limited to {max_size} bytes'},
+                                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+                    if remaining is not None and size > remaining:
+                        f.truncate(session.bytes_received)
+                        return too_large
+                    f.write(block)
+                    digest.update(block)
+                
+                expected = request.headers.get('X-Chunk-SHA256')
+                if expected and expected.lower() != digest.hexdigest():
+                    f.truncate(session.bytes_received)
+                    return Response({'error': 'Chunk checksum mismatch'}, status=status.HTTP_400_BAD_REQUEST)
+            
+            session.checksum = hashlib.sha256(bytes.fromhex(session.checksum) + digest.digest()).hexdigest()
+            session.bytes_received += size
+            session.next_chunk += 1
+            session.save(update_fields=['checksum', 'bytes_received', 'next_chunk', 'updated_at'])
+        
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+
+
+class UploadSessionFinalizeView(generics.GenericAPIView):
+    """
+    Turn a completed session into an Upload and start processing it
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionFinalizeSerializer
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        options = dict(serializer.validated_data)
+        expected_checksum = options.pop('checksum', None)
+        
+        with transaction.atomic():
+            try:
+                session = UploadSession.objects.select_for_update().get(pk=kwargs['pk'])
+            except UploadSession.DoesNotExist:
+                return Response({'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+            
+            if session.status != 'open':
+                return Response(UploadSerializer(session.upload).data, status=status.HTTP_200_OK)
+            if session.total_size is not None and session.bytes_received != session.total_size:
+                return Response({
+                    'error': f'Received {session.bytes_received} of {session.total_size} bytes',
+                    'next_chunk': session.next_chunk,
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if expected_checksum and expected_checksum.lower() != session.checksum:
+                return Response({'error': 'Checksum mismatch'}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Move the assembled file into place under its real name
+            final_name = default_storage.get_available_name(f"uploads/{os.path.basename(session.filename)}")
+            os.replace(default_storage.path(session.file_name), default_storage.path(final_name))
+            
+            upload = Upload.objects.create(file=final_name, **options)
+            session.upload = upload
+            session.file_name = final_name
+            session.status = 'finalized'
+            session.save(update_fields=['upload', 'file_name', 'status', 'updated_at'])
+            
+            transaction.on_commit(lambda: process_csv_upload.delay(upload.id))
+        
+        return Response(UploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+
+class MappingProfileListCreateView(generics.ListCreateAPIView):
+    queryset = MappingProfile.objects.all()
+    serializer_class = MappingProfileSerializer
+
+
+class MappingProfileRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = MappingProfile.objects.all()
+    serializer_class = MappingProfileSerializer
+    
     
 class ProcessUploadView(generics.GenericAPIView):
     def post(self, request, *args, **kwargs):
@@ -38,19 +230,9 @@ class ProcessUploadView(generics.GenericAPIView):
 @api_view(['GET'])
 def upload_stats(request):
     """
-    Get upload statistics
+    Get upload statistics (one query, cached until an upload changes status)
     """
-    total = Upload.objects.count()
-    completed = Upload.objects.filter(status='completed').count()
-    processing = Upload.objects.filter(status='processing').count()
-    failed = Upload.objects.filter(status='failed').count()
-    
-    return Response({
-        'total': total,
-        'completed': completed,
-        'processing': processing,
-        'failed': failed
-    })
+    return Response(get_upload_stats())
 
 
 @api_view(['GET'])
@@ -59,6 +241,98 @@ def recent_uploads(request):
     Get recent uploads with progress information
     """
     # Get the 10 most recent uploads
-    recent = Upload.objects.all().order_by('-created_at')[:10]
+    recent = apply_live_progress(list(Upload.objects.all().order_by('-created_at')[:10]))
     serializer = UploadSerializer(recent, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    return Response(serializer.data)
+
+
+async def upload_events(request, pk):
+    """
+    Stream upload progress as Server-Sent Events.
+
+    An event is pushed only when the progress changes, and the stream ends
+    once the upload completes or fails. Streams are capped at
+    UPLOAD_EVENTS_MAX_SECONDS, and EventSource clients reconnect on their own.
+
+    Under WSGI a streamed response is buffered until it ends, so the current
+    progress is sent as a single event instead and the client reconnects
+    after ``SSE_WSGI_RETRY_MS``, which amounts to polling.
+    """
+    watcher = UploadWatcher(pk)
+    try:
+        token, upload = await watcher.snapshot()
+    except Upload.DoesNotExist:
+        await watcher.close()
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+    
+    if not isinstance(request, ASGIRequest):
+        await watcher.close()
+        response = HttpResponse(f"retry: {SSE_WSGI_RETRY_MS}\n" + _progress_event(token, upload),
+                                content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        return response
+    
+    response = StreamingHttpResponse(_upload_event_stream(watcher), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _progress_event(token, upload):
+    data = json.dumps(UploadSerializer(upload).data)
+    return f"id: {token}\nevent: progress\ndata: {data}\n\n"
+
+
+async def _upload_event_stream(watcher):
+    started_at = last_write = time.monotonic()
+    last_token = None
+    try:
+        while True:
+            token, upload = await watcher.snapshot()
+            if token != last_token:
+                yield _progress_event(token, upload)
+                last_token = token
+                last_write = time.monotonic()
+                if upload.status in FINISHED_STATUSES:
+                    return
+            elif time.monotonic() - last_write >= SSE_HEARTBEAT_SECONDS:
+                yield ": keep-alive\n\n"
+                last_write = time.monotonic()
+            
+            if time.monotonic() - started_at >= settings.UPLOAD_EVENTS_MAX_SECONDS:
+                return
+            await asyncio.sleep(settings.UPLOAD_EVENTS_POLL_INTERVAL)
+    finally:
+        await watcher.close()
+
+
+async def upload_wait(request, pk):
+    """
+    Long-poll for upload progress.
+
+    Returns as soon as the upload's version token differs from ``?version=``,
+    or when ``?timeout=`` seconds pass. The response carries the new
+    ``version`` to send with the next call.
+    """
+    since = request.GET.get('version')
+    try:
+        timeout = min(float(request.GET.get('timeout', 25)), settings.UPLOAD_EVENTS_MAX_SECONDS)
+    except ValueError:
+        return JsonResponse({'error': 'timeout must be a number'}, status=400)
+    
+    deadline = time.monotonic() + timeout
+    watcher = UploadWatcher(pk)
+    try:
+        while True:
+            token, upload = await watcher.snapshot()
+            if token != since or upload.status in FINISHED_STATUSES or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(settings.UPLOAD_EVENTS_POLL_INTERVAL)
+    except Upload.DoesNotExist:
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+    finally:
+        await watcher.close()
+    
+    data = dict(UploadSerializer(upload).data)
+    data['version'] = token
+    return JsonResponse(data)
\ No newline at end of file
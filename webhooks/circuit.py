@@ -0,0 +1,79 @@
+"""
+Per-webhook circuit breaker.
+
+After ``WEBHOOK_CIRCUIT_FAILURE_THRESHOLD`` failed deliveries in a row the
+circuit opens: the endpoint is not contacted for
+``WEBHOOK_CIRCUIT_RESET_TIMEOUT`` seconds and its deliveries are
+rescheduled. Once that passes, a single delivery is let through as a
+probe, which moves the window forward; success closes the circuit,
+failure leaves it open until the new window ends. The state
+lives on the ``Webhook`` row, so every worker sees the same circuit.
+Opening or closing it invalidates the cached subscriptions that carry
+it; counting a failure does not, so a failing endpoint doesn't keep
+flushing the cache.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Webhook
+from .subscriptions import invalidate_subscriptions
+
+
+def check_circuit(webhook):
+    """
+    Return ``(allowed, retry_at)`` for contacting ``webhook`` now.
+
+    With an expired open circuit, exactly one caller wins the probe by
+    moving ``circuit_open_until`` forward; the others are told to wait.
+    """
+    open_until = webhook.circuit_open_until
+    if open_until is None:
+        return True, None
+    
+    now = timezone.now()
+    if open_until > now:
+        return False, open_until
+    
+    probe_until = now + timedelta(seconds=settings.WEBHOOK_CIRCUIT_RESET_TIMEOUT)
+    claimed = Webhook.objects.filter(id=webhook.id, circuit_open_until=open_until).update(
+        circuit_open_until=probe_until
+    )
+    webhook.circuit_open_until = probe_until
+    if claimed:
+        invalidate_subscriptions()
+    return bool(claimed), None if claimed else probe_until
+
+
+def record_success(webhook):
+    # Cached rows don't track the failure count, so check the database
+    reset = Webhook.objects.filter(id=webhook.id).filter(
+        Q(consecutive_failures__gt=0) | Q(circuit_open_until__isnull=False)
+    ).update(consecutive_failures=0, circuit_open_until=None)
+    webhook.consecutive_failures = 0
+    webhook.circuit_open_until = None
+    if reset:
+        invalidate_subscriptions()
+
+
+def record_failure(webhook):
+    """
+    Count a failed delivery, opening the circuit at the threshold; True
+    only when this failure opened it
+    """
+    now = timezone.now()
+    open_until = now + timedelta(seconds=settings.WEBHOOK_CIRCUIT_RESET_TIMEOUT)
+    Webhook.objects.filter(id=webhook.id).update(consecutive_failures=F('consecutive_failures') + 1)
+    # Only a closed (or lapsed) circuit opens; failures while it is open,
+    # a failed probe included, leave the window where it is
+    opened = Webhook.objects.filter(
+        Q(circuit_open_until__isnull=True) | Q(circuit_open_until__lte=now),
+        id=webhook.id,
+        consecutive_failures__gte=settings.WEBHOOK_CIRCUIT_FAILURE_THRESHOLD,
+    ).update(circuit_open_until=open_until)
+    webhook.consecutive_failures += 1
+    if opened:
+        # A cached row's count may be behind
+        webhook.refresh_from_db(fields=['consecutive_failures', 'circuit_open_until'])
+        invalidate_subscriptions()
+    return bool(opened)
@@ -0,0 +1,109 @@
+"""
+Webhook delivery engine.
+
+Each subscriber host gets its own ``requests.Session`` with a keep-alive
+connection pool, kept for the life of the worker process, so repeated
+events reuse open (TLS) connections instead of handshaking every time.
+An event is posted to all of its subscribers concurrently through a
+bounded thread pool, so one slow endpoint no longer holds up the rest.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+SUCCESS_STATUS_CODES = (200, 201, 202, 204)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url):
+    """
+    Return the pooled session for the scheme and host of ``url``
+    """
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.WEBHOOK_MAX_CONCURRENCY,
+            )
+            session.mount(f"{parts.scheme}://", adapter)
+            _sessions[key] = session
+        return session
+
+
+def close_sessions():
+    """
+    Close every pooled connection (e.g. when a worker shuts down)
+    """
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def build_headers(webhook):
+    headers = {
+        'Content-Type': 'application/json'
+    }
+    if webhook.secret_key:
+        headers['X-Webhook-Secret'] = webhook.secret_key
+    return headers
+
+
+def deliver(webhook, payload):
+    """
+    POST ``payload`` to one webhook and return the outcome with its latency
+    """
+    started_at = time.perf_counter()
+    try:
+        response = get_session(webhook.url).post(
+            webhook.url,
+            json=payload,
+            headers=build_headers(webhook),
+            timeout=(settings.WEBHOOK_CONNECT_TIMEOUT, settings.WEBHOOK_READ_TIMEOUT),
+        )
+        return {
+            'webhook_id': webhook.id,
+            'status_code': response.status_code,
+            'success': response.status_code in SUCCESS_STATUS_CODES,
+            'latency_ms': round((time.perf_counter() - started_at) * 1000, 1),
+        }
+    except requests.exceptions.RequestException as e:
+        return {
+            'webhook_id': webhook.id,
+            'error': str(e),
+            'success': False,
+            'latency_ms': round((time.perf_counter() - started_at) * 1000, 1),
+        }
+
+
+def deliver_all(webhooks, payload, max_workers=None):
+    """
+    Deliver ``payload`` to every webhook concurrently, at most
+    ``WEBHOOK_MAX_CONCURRENCY`` at a time; results keep the input order
+    """
+    return deliver_many([(webhook, payload) for webhook in webhooks], max_workers)
+
+
+def deliver_many(requests_to_send, max_workers=None):
+    """
+    Deliver a list of ``(webhook, payload)`` pairs concurrently; results
+    keep the input order
+    """
+    if not requests_to_send:
+        return []
+    workers = min(max_workers or settings.WEBHOOK_MAX_CONCURRENCY, len(requests_to_send))
+    if workers == 1:
+        return [deliver(webhook, payload) for webhook, payload in requests_to_send]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='webhook') as executor:
+        return list(executor.map(lambda pair: deliver(*pair), requests_to_send))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='webhook',
+            name='event_type',
+            field=models.CharField(choices=[('product_imported', 'Product Imported'), ('product_updated', 'Product Updated'), ('product_deleted', 'Product Deleted'), ('all_products_deleted', 'All Products Deleted'), ('products_bulk_deleted', 'Products Bulk Deleted')], max_length=50),
+        ),
+    ]
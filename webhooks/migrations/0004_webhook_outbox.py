@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0003_bulk_update_event_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('product_imported', 'Product Imported'), ('product_updated', 'Product Updated'), ('product_deleted', 'Product Deleted'), ('all_products_deleted', 'All Products Deleted'), ('products_bulk_deleted', 'Products Bulk Deleted'), ('products_bulk_updated', 'Products Bulk Updated')], max_length=50)),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'webhook_outbox',
+                'ordering': ['id'],
+            },
+        ),
+    ]
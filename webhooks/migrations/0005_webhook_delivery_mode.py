@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0004_webhook_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhook',
+            name='delivery_mode',
+            field=models.CharField(choices=[('item', 'One request per event'), ('batch', 'One request per batch of events')], default='item', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='event_type',
+            field=models.CharField(choices=[('product_imported', 'Product Imported'), ('product_updated', 'Product Updated'), ('product_deleted', 'Product Deleted'), ('all_products_deleted', 'All Products Deleted'), ('products_bulk_deleted', 'Products Bulk Deleted'), ('products_bulk_updated', 'Products Bulk Updated'), ('products_upserted', 'Products Upserted (SKU pages)'), ('products_deleted', 'Products Deleted (SKU pages)')], max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='webhook',
+            name='event_type',
+            field=models.CharField(choices=[('product_imported', 'Product Imported'), ('product_updated', 'Product Updated'), ('product_deleted', 'Product Deleted'), ('all_products_deleted', 'All Products Deleted'), ('products_bulk_deleted', 'Products Bulk Deleted'), ('products_bulk_updated', 'Products Bulk Updated'), ('products_upserted', 'Products Upserted (SKU pages)'), ('products_deleted', 'Products Deleted (SKU pages)')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0005_webhook_delivery_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhook',
+            name='circuit_open_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='webhook',
+            name='consecutive_failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('product_imported', 'Product Imported'), ('product_updated', 'Product Updated'), ('product_deleted', 'Product Deleted'), ('all_products_deleted', 'All Products Deleted'), ('products_bulk_deleted', 'Products Bulk Deleted'), ('products_bulk_updated', 'Products Bulk Updated'), ('products_upserted', 'Products Upserted (SKU pages)'), ('products_deleted', 'Products Deleted (SKU pages)')], max_length=50)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('retrying', 'Retrying'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('latency_ms', models.FloatField(blank=True, null=True)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('webhook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='webhooks.webhook')),
+            ],
+            options={
+                'db_table': 'webhook_deliveries',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['webhook', '-id'], name='webhook_del_webhook_587fa4_idx'), models.Index(fields=['status'], name='webhook_del_status_269a2c_idx'), models.Index(fields=['created_at'], name='webhook_del_created_50111d_idx')],
+            },
+        ),
+    ]
@@ -7,12 +7,26 @@ class Webhook(models.Model):
         ('product_updated', 'Product Updated'),
         ('product_deleted', 'Product Deleted'),
         ('all_products_deleted', 'All Products Deleted'),
+        ('products_bulk_deleted', 'Products Bulk Deleted'),
+        ('products_bulk_updated', 'Products Bulk Updated'),
+        ('products_upserted', 'Products Upserted (SKU pages)'),
+        ('products_deleted', 'Products Deleted (SKU pages)'),
+    ]
+    
+    DELIVERY_MODE_CHOICES = [
+        ('item', 'One request per event'),
+        ('batch', 'One request per batch of events'),
     ]
     
     url = models.URLField(max_length=500)
     event_type = models.CharField(max_length=50, choices=WEBHOOK_EVENTS)
     is_active = models.BooleanField(default=True)
+    delivery_mode = models.CharField(max_length=10, choices=DELIVERY_MODE_CHOICES, default='item')
     secret_key = models.CharField(max_length=100, blank=True, null=True)
+    # Circuit breaker: failed deliveries in a row, and until when the
+    # endpoint is left alone once they reach the threshold
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    circuit_open_until = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -26,3 +40,56 @@ class Webhook(models.Model):
             models.Index(fields=['is_active']),
             models.Index(fields=['created_at']),
         ]
+
+
+class OutboxEvent(models.Model):
+    """
+    A webhook event written in the same transaction as the change it
+    describes; the outbox relay dispatches it once that transaction commits
+    """
+    event_type = models.CharField(max_length=50, choices=Webhook.WEBHOOK_EVENTS)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.event_type} #{self.id}"
+        
+    class Meta:
+        db_table = 'webhook_outbox'
+        ordering = ['id']
+
+
+class WebhookDelivery(models.Model):
+    """
+    One event sent to one webhook, with the outcome of its latest attempt
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('retrying', 'Retrying'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    webhook = models.ForeignKey(Webhook, on_delete=models.CASCADE, related_name='deliveries')
+    event_type = models.CharField(max_length=50, choices=Webhook.WEBHOOK_EVENTS)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    status_code = models.IntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    latency_ms = models.FloatField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.event_type} -> webhook {self.webhook_id} - {self.status}"
+        
+    class Meta:
+        db_table = 'webhook_deliveries'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['webhook', '-id']),
+            models.Index(fields=['status']),
+            models.Index(fields=['created_at']),
+        ]
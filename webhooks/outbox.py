@@ -0,0 +1,135 @@
+"""
+Transactional outbox for webhook events.
+
+Request handlers record events with ``enqueue_event`` inside the same
+database transaction as the product change, so an event exists exactly
+when its change was committed and no broker round-trip is made on the
+request path (events without subscribers are not even written).
+``relay_outbox_events`` (run by Celery beat) drains the
+table in batches and hands each event type to a single webhook task.
+
+Changes touching many products (imports, bulk jobs) are reported as pages
+of SKUs, at most ``WEBHOOK_EVENT_PAGE_SIZE`` per event, instead of one
+event per product.
+"""
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import OutboxEvent
+from .subscriptions import has_subscribers
+
+
+def enqueue_event(event_type, payload):
+    """
+    Record a webhook event; call it inside the transaction making the change.
+
+    Events nobody subscribes to are dropped here, before any write.
+    """
+    if not has_subscribers(event_type):
+        return None
+    return OutboxEvent.objects.create(event_type=event_type, payload=payload)
+
+
+def enqueue_sku_pages(event_type, skus, first_page=1, **fields):
+    """
+    Record ``skus`` as ``event_type`` events of at most
+    ``WEBHOOK_EVENT_PAGE_SIZE`` SKUs each; ``fields`` are added to every
+    payload. Returns the number of the next page.
+    """
+    page_size = settings.WEBHOOK_EVENT_PAGE_SIZE
+    timestamp = timezone.now().isoformat()
+    events = []
+    page = first_page
+    for start in range(0, len(skus), page_size):
+        page_skus = list(skus[start:start + page_size])
+        events.append(OutboxEvent(event_type=event_type, payload={
+            'event': event_type,
+            **fields,
+            'page': page,
+            'count': len(page_skus),
+            'skus': page_skus,
+            'timestamp': timestamp
+        }))
+        page += 1
+    OutboxEvent.objects.bulk_create(events)
+    return page
+
+
+def claim_batch(batch_size):
+    """
+    Lock the oldest undispatched events, skipping rows another relay holds.
+
+    Must be called inside a transaction.
+    """
+    return list(
+        OutboxEvent.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size]
+    )
+
+
+def group_by_event_type(events):
+    """
+    Payloads per event type, in the order the events were written
+    """
+    grouped = defaultdict(list)
+    for event in events:
+        grouped[event.event_type].append(event.payload)
+    return grouped
+
+
+def coalesce_payloads(payloads):
+    """
+    Keep only the latest payload per product.
+
+    Several changes to one product within a relay window then reach
+    subscribers as a single event. Payloads without a ``product_id``
+    (SKU pages, bulk summaries) are all kept.
+    """
+    latest = {}
+    for index, payload in enumerate(payloads):
+        key = payload.get('product_id')
+        latest[index if key is None else ('product', key)] = index
+    keep = sorted(latest.values())
+    return [payloads[index] for index in keep]
+
+
+def split_batches(payloads):
+    """
+    Group payloads into batch requests of at most ``WEBHOOK_EVENT_PAGE_SIZE``
+    SKUs each, so a batch subscriber never gets a larger body than a page.
+
+    A SKU page counts as its ``count`` of SKUs, any other event as one.
+    """
+    page_size = settings.WEBHOOK_EVENT_PAGE_SIZE
+    batches = []
+    batch = []
+    size = 0
+    for payload in payloads:
+        weight = max(1, len(payload.get('skus', ())))
+        if batch and size + weight > page_size:
+            batches.append(batch)
+            batch = []
+            size = 0
+        batch.append(payload)
+        size += weight
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def relay_batch(batch_size, dispatch):
+    """
+    Dispatch and delete one batch of events; returns how many were relayed.
+
+    ``dispatch(event_type, payloads)`` is called once per event type. If it
+    raises (e.g. the broker is down), the transaction rolls back and the
+    events stay in the outbox for the next run.
+    """
+    with transaction.atomic():
+        events = claim_batch(batch_size)
+        if not events:
+            return 0
+        for event_type, payloads in group_by_event_type(events).items():
+            dispatch(event_type, payloads)
+        OutboxEvent.objects.filter(id__in=[event.id for event in events]).delete()
+    return len(events)
@@ -1,9 +1,22 @@
 from rest_framework import serializers
-from .models import Webhook
+from .models import Webhook, WebhookDelivery
 
 
 class WebhookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Webhook
-        fields = ['id', 'url', 'event_type', 'is_active', 'secret_key', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
\ No newline at end of file
+        fields = [
+            'id', 'url', 'event_type', 'is_active', 'delivery_mode', 'secret_key',
+            'consecutive_failures', 'circuit_open_until', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'consecutive_failures', 'circuit_open_until', 'created_at', 'updated_at']
+
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookDelivery
+        fields = [
+            'id', 'webhook', 'event_type', 'payload', 'status', 'attempts', 'status_code',
+            'error', 'latency_ms', 'next_attempt_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
\ No newline at end of file
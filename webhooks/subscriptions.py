@@ -0,0 +1,115 @@
+"""
+Cached lookup of the active webhooks subscribed to an event type.
+
+Subscriptions rarely change, so they are cached twice: per event type in
+Redis, shared by every process, and in process memory. Both are keyed by a
+version stamp kept in Redis; ``invalidate_subscriptions`` replaces the
+stamp, which orphans every cached list at once. A process re-reads the
+stamp at most every ``WEBHOOK_SUBSCRIPTION_CACHE_TTL`` seconds, so other
+processes see a change within that time and the one making it at once.
+"""
+import copy
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from .models import Webhook
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'webhooks:subscriptions:version'
+# Lists cached under old versions are never read again; let them expire
+SUBSCRIPTIONS_CACHE_TIMEOUT = 24 * 60 * 60
+
+_local = {'version': None, 'checked_at': 0.0, 'subscriptions': {}}
+_lock = threading.Lock()
+
+
+def subscriptions_cache_key(version, event_type):
+    return f"webhooks:subscriptions:{version}:{event_type}"
+
+
+def load_subscriptions(event_type):
+    return list(Webhook.objects.filter(event_type=event_type, is_active=True))
+
+
+def current_version():
+    """
+    The shared version stamp, created if missing; None if Redis is unreachable
+    """
+    try:
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(VERSION_CACHE_KEY, time.time_ns(), None)
+            version = cache.get(VERSION_CACHE_KEY)
+        return version
+    except Exception as e:
+        logger.warning(f"Could not read the webhook subscriptions version: {str(e)}")
+        return None
+
+
+def get_subscriptions(event_type):
+    """
+    Active webhooks for ``event_type``, as copies callers may modify
+    """
+    with _lock:
+        now = time.monotonic()
+        if now - _local['checked_at'] >= settings.WEBHOOK_SUBSCRIPTION_CACHE_TTL:
+            version = current_version()
+            if version is None or version != _local['version']:
+                _local['subscriptions'] = {}
+            _local['version'] = version
+            _local['checked_at'] = now
+
+        subscriptions = _local['subscriptions'].get(event_type)
+        if subscriptions is None:
+            subscriptions = get_shared_subscriptions(_local['version'], event_type)
+            _local['subscriptions'][event_type] = subscriptions
+
+    return [copy.copy(webhook) for webhook in subscriptions]
+
+
+def get_shared_subscriptions(version, event_type):
+    """
+    Subscriptions cached in Redis under ``version``, loaded from the
+    database on a miss (or straight from it without Redis)
+    """
+    if version is None:
+        return load_subscriptions(event_type)
+
+    key = subscriptions_cache_key(version, event_type)
+    try:
+        subscriptions = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Could not read cached webhook subscriptions: {str(e)}")
+        return load_subscriptions(event_type)
+
+    if subscriptions is None:
+        subscriptions = load_subscriptions(event_type)
+        try:
+            cache.set(key, subscriptions, SUBSCRIPTIONS_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Could not cache webhook subscriptions: {str(e)}")
+    return subscriptions
+
+
+def has_subscribers(event_type):
+    """
+    Whether any active webhook listens for ``event_type``
+    """
+    return bool(get_subscriptions(event_type))
+
+
+def invalidate_subscriptions():
+    """
+    Drop every cached subscription list, here and in all other processes
+    """
+    with _lock:
+        _local['version'] = None
+        _local['checked_at'] = 0.0
+        _local['subscriptions'] = {}
+    try:
+        cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached webhook subscriptions: {str(e)}")
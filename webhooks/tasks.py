@@ -1,58 +1,259 @@
 from celery import shared_task
-from .models import Webhook
-import requests
-import json
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import WebhookDelivery
+from .circuit import check_circuit, record_failure, record_success
+from .delivery import deliver_many
+from .outbox import coalesce_payloads, relay_batch, split_batches
+from .subscriptions import get_subscriptions, has_subscribers
 import logging
+import random
+import time
 
 logger = logging.getLogger(__name__)
 
 
+def is_retryable(result):
+    """
+    Network errors, 5xx, 408 and 429 are worth retrying; other 4xx are not
+    """
+    status_code = result.get('status_code')
+    return status_code is None or status_code >= 500 or status_code in (408, 429)
+
+
+def retry_delay(attempts):
+    """
+    Seconds before the next attempt: exponential backoff with jitter
+    """
+    delay = min(settings.WEBHOOK_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.WEBHOOK_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1)
+
+
+def schedule_retry(delivery, retry_at):
+    delivery.status = 'retrying'
+    delivery.next_attempt_at = retry_at
+    delivery.save()
+    countdown = max(0, (retry_at - timezone.now()).total_seconds())
+    deliver_webhook.apply_async((delivery.id,), countdown=countdown)
+
+
+def record_result(delivery, result):
+    """
+    Store the outcome of an attempt, update the circuit and reschedule
+    the delivery if it failed and may be retried
+    """
+    webhook = delivery.webhook
+    delivery.attempts += 1
+    delivery.status_code = result.get('status_code')
+    delivery.latency_ms = result['latency_ms']
+    
+    if result['success']:
+        delivery.status = 'succeeded'
+        delivery.error = ''
+        delivery.next_attempt_at = None
+        delivery.save()
+        record_success(webhook)
+        return
+    
+    delivery.error = result.get('error') or f"HTTP {delivery.status_code}"
+    if record_failure(webhook):
+        logger.warning(f"Webhook {webhook.id}: circuit opened after {webhook.consecutive_failures} failures")
+    
+    if is_retryable(result) and delivery.attempts < settings.WEBHOOK_MAX_ATTEMPTS:
+        schedule_retry(delivery, timezone.now() + timedelta(seconds=retry_delay(delivery.attempts)))
+    else:
+        delivery.status = 'failed'
+        delivery.next_attempt_at = None
+        delivery.save()
+        logger.error(f"Webhook delivery {delivery.id} to webhook {webhook.id} failed after {delivery.attempts} attempts: {delivery.error}")
+
+
+def hold_back(delivery, retry_at, expires_before):
+    """
+    Keep a delivery away from an open circuit: reschedule it for when the
+    endpoint may be probed, or fail it once it is too old
+    """
+    if delivery.created_at < expires_before:
+        delivery.status = 'failed'
+        delivery.error = 'Circuit open; delivery expired'
+        delivery.next_attempt_at = None
+        delivery.save()
+    else:
+        delivery.error = 'Circuit open'
+        schedule_retry(delivery, retry_at)
+
+
+def attempt_deliveries(deliveries):
+    """
+    Make one attempt at each delivery, concurrently.
+
+    Deliveries go out in waves of at most ``WEBHOOK_CIRCUIT_FAILURE_THRESHOLD``
+    per webhook, and the circuit is checked again before each wave. An
+    endpoint that fails a whole wave has its circuit opened, and its
+    remaining deliveries are not sent. Deliveries to an endpoint whose
+    circuit is open are rescheduled for when it may be probed, without
+    using up an attempt, until they are ``WEBHOOK_DELIVERY_EXPIRY`` seconds
+    old. A probing endpoint gets a single delivery in its wave.
+    """
+    now = timezone.now()
+    expires_before = now - timedelta(seconds=settings.WEBHOOK_DELIVERY_EXPIRY)
+    wave_size = max(1, settings.WEBHOOK_CIRCUIT_FAILURE_THRESHOLD)
+    # Webhook id -> deliveries still to send, in order
+    pending = {}
+    for delivery in deliveries:
+        queued = pending.setdefault(delivery.webhook_id, [])
+        if queued:
+            # One instance per webhook, so every wave sees its circuit state
+            delivery.webhook = queued[0].webhook
+        queued.append(delivery)
+    
+    results = []
+    while pending:
+        to_send = []
+        for webhook_id, queued in list(pending.items()):
+            webhook = queued[0].webhook
+            allowed, retry_at = check_circuit(webhook)
+            if not allowed:
+                for delivery in queued:
+                    hold_back(delivery, retry_at, expires_before)
+                del pending[webhook_id]
+                continue
+            # Probing: this delivery goes, the rest waits for its outcome
+            size = 1 if webhook.circuit_open_until is not None else wave_size
+            to_send.extend(queued[:size])
+            del queued[:size]
+            if not queued:
+                del pending[webhook_id]
+        
+        wave_results = deliver_many([(delivery.webhook, delivery.payload) for delivery in to_send])
+        for delivery, result in zip(to_send, wave_results):
+            record_result(delivery, result)
+            result['delivery_id'] = delivery.id
+        results.extend(wave_results)
+    return results
+
+
 @shared_task
 def send_webhook_notification(event_type, payload):
     """
     Send webhook notifications for events
     """
+    return send_webhook_batch(event_type, [payload])
+
+
+@shared_task
+def send_webhook_batch(event_type, payloads):
+    """
+    Send several events of one type, looking the subscribers up only once.
+
+    Repeated events for the same product are coalesced to the latest one.
+    ``item`` subscribers get one request per event; ``batch`` subscribers
+    get requests carrying lists of events, at most
+    ``WEBHOOK_EVENT_PAGE_SIZE`` SKUs each. Every request is logged as a
+    ``WebhookDelivery`` and retried on failure.
+    """
     try:
-        # Get all active webhooks for this event type
-        webhooks = Webhook.objects.filter(event_type=event_type, is_active=True)
-        
-        results = []
+        webhooks = get_subscriptions(event_type)
+        payloads = coalesce_payloads(payloads)
         
+        deliveries = []
+        batch_payloads = None
         for webhook in webhooks:
-            try:
-                headers = {
-                    'Content-Type': 'application/json'
-                }
-                
-                if webhook.secret_key:
-                    headers['X-Webhook-Secret'] = webhook.secret_key
-                
-                response = requests.post(
-                    webhook.url, 
-                    json=payload, 
-                    headers=headers, 
-                    timeout=10
-                )
-                
-                results.append({
-                    'webhook_id': webhook.id,
-                    'status_code': response.status_code,
-                    'success': response.status_code in [200, 201, 202, 204]
-                })
-                
-                logger.info(f"Webhook {webhook.id} sent successfully: {response.status_code}")
-                
-            except requests.exceptions.RequestException as e:
-                results.append({
-                    'webhook_id': webhook.id,
-                    'error': str(e),
-                    'success': False
-                })
-                
-                logger.error(f"Failed to send webhook {webhook.id}: {str(e)}")
+            if webhook.delivery_mode == 'batch':
+                if batch_payloads is None:
+                    batch_payloads = [{
+                        'event': event_type,
+                        'batch': True,
+                        'count': len(batch),
+                        'events': batch
+                    } for batch in split_batches(payloads)]
+                webhook_payloads = batch_payloads
+            else:
+                webhook_payloads = payloads
+            deliveries.extend(
+                WebhookDelivery(webhook=webhook, event_type=event_type, payload=payload)
+                for payload in webhook_payloads
+            )
+        if not deliveries:
+            return []
+        deliveries = WebhookDelivery.objects.bulk_create(deliveries)
         
-        return results
+        results = attempt_deliveries(deliveries)
+        
+        failed = sum(1 for result in results if not result['success'])
+        logger.info(
+            f"Sent {len(payloads)} {event_type} events to {len(webhooks)} webhooks: "
+            f"{len(results)} requests, {failed} failed, {len(deliveries) - len(results)} deferred"
+        )
         
+        return results
+    
     except Exception as e:
         logger.error(f"Failed to process webhooks for event {event_type}: {str(e)}")
-        return {'error': str(e)}
\ No newline at end of file
+        return {'error': str(e)}
+
+
+@shared_task
+def deliver_webhook(delivery_id):
+    """
+    Retry one logged delivery
+    """
+    try:
+        delivery = WebhookDelivery.objects.select_related('webhook').get(id=delivery_id)
+    except WebhookDelivery.DoesNotExist:
+        return f"Webhook delivery {delivery_id} not found"
+    
+    if delivery.status in ('succeeded', 'failed'):
+        return f"Webhook delivery {delivery_id} already {delivery.status}"
+    
+    if not delivery.webhook.is_active:
+        delivery.status = 'failed'
+        delivery.error = 'Webhook disabled'
+        delivery.next_attempt_at = None
+        delivery.save()
+        return f"Webhook {delivery.webhook_id} is disabled"
+    
+    return attempt_deliveries([delivery])
+
+
+@shared_task
+def prune_webhook_deliveries():
+    """
+    Delete finished delivery records older than ``WEBHOOK_DELIVERY_RETENTION_DAYS``
+    """
+    cutoff = timezone.now() - timedelta(days=settings.WEBHOOK_DELIVERY_RETENTION_DAYS)
+    deleted, _ = WebhookDelivery.objects.filter(
+        status__in=['succeeded', 'failed'], created_at__lt=cutoff
+    ).delete()
+    if deleted:
+        logger.info(f"Pruned {deleted} webhook deliveries")
+    return deleted
+
+
+@shared_task
+def relay_outbox_events():
+    """
+    Drain the webhook outbox, one task per event type and batch.
+
+    Runs from Celery beat; stops once the outbox is empty or after
+    ``WEBHOOK_OUTBOX_RELAY_MAX_SECONDS`` so the next run takes over.
+    """
+    deadline = time.monotonic() + settings.WEBHOOK_OUTBOX_RELAY_MAX_SECONDS
+    batch_size = settings.WEBHOOK_OUTBOX_BATCH_SIZE
+    
+    def dispatch(event_type, payloads):
+        # Subscribers may have gone since the events were written
+        if has_subscribers(event_type):
+            send_webhook_batch.delay(event_type, payloads)
+    
+    relayed = 0
+    while time.monotonic() < deadline:
+        count = relay_batch(batch_size, dispatch)
+        relayed += count
+        if count < batch_size:
+            break
+    
+    if relayed:
+        logger.info(f"Relayed {relayed} outbox events")
+    return relayed
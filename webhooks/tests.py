@@ -1,3 +1,157 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.test import TestCase, override_settings
+from .circuit import record_failure, record_success
+from .delivery import close_sessions, deliver_many
+from .models import Webhook, WebhookDelivery
+from .outbox import split_batches
+from .tasks import attempt_deliveries, record_result, send_webhook_batch
 
-# Create your tests here.
+
+def sku_page(page, count):
+    return {'event': 'products_upserted', 'page': page, 'count': count,
+            'skus': [f"SKU-{page}-{i}" for i in range(count)]}
+
+
+@override_settings(WEBHOOK_EVENT_PAGE_SIZE=1000)
+class BatchDeliveryTests(TestCase):
+    def test_split_batches_caps_skus_per_request(self):
+        payloads = [sku_page(1, 1000), sku_page(2, 600), sku_page(3, 400), sku_page(4, 1)]
+        batches = split_batches(payloads)
+        self.assertEqual([[payload['page'] for payload in batch] for batch in batches], [[1], [2, 3], [4]])
+
+    def test_split_batches_counts_single_events_as_one(self):
+        payloads = [{'event': 'product_updated', 'product_id': i} for i in range(2500)]
+        self.assertEqual([len(batch) for batch in split_batches(payloads)], [1000, 1000, 500])
+
+    def test_batch_subscribers_get_split_requests(self):
+        webhook = Webhook.objects.create(url='https://example.com/hook', event_type='products_upserted',
+                                         delivery_mode='batch')
+        payloads = [sku_page(page, 1000) for page in range(1, 4)]
+        with mock.patch('webhooks.tasks.get_subscriptions', return_value=[webhook]), \
+                mock.patch('webhooks.tasks.attempt_deliveries', return_value=[]):
+            send_webhook_batch('products_upserted', payloads)
+
+        deliveries = WebhookDelivery.objects.filter(webhook=webhook).order_by('id')
+        self.assertEqual(len(deliveries), 3)
+        for delivery, page in zip(deliveries, range(1, 4)):
+            self.assertEqual(delivery.payload['count'], 1)
+            self.assertEqual(delivery.payload['events'][0]['page'], page)
+
+
+@override_settings(WEBHOOK_CIRCUIT_FAILURE_THRESHOLD=3)
+class CircuitTests(TestCase):
+    def setUp(self):
+        self.webhook = Webhook.objects.create(url='https://example.com/hook', event_type='product_updated')
+
+    def test_failures_only_invalidate_subscriptions_when_the_circuit_opens(self):
+        with mock.patch('webhooks.circuit.invalidate_subscriptions') as invalidate:
+            self.assertEqual([record_failure(self.webhook) for _ in range(3)], [False, False, True])
+            self.webhook.refresh_from_db()
+            open_until = self.webhook.circuit_open_until
+
+            # Failures while the circuit is open neither reopen it nor flush the cache
+            self.assertEqual([record_failure(self.webhook) for _ in range(2)], [False, False])
+        self.assertEqual(invalidate.call_count, 1)
+        self.webhook.refresh_from_db()
+        self.assertEqual(self.webhook.consecutive_failures, 5)
+        self.assertEqual(self.webhook.circuit_open_until, open_until)
+
+    def test_success_resets_failures_counted_behind_a_cached_row(self):
+        record_failure(Webhook.objects.get(id=self.webhook.id))
+        # The cached subscription row still shows no failures
+        with mock.patch('webhooks.circuit.invalidate_subscriptions') as invalidate:
+            record_success(self.webhook)
+        self.webhook.refresh_from_db()
+        self.assertEqual(self.webhook.consecutive_failures, 0)
+        self.assertEqual(invalidate.call_count, 1)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    ``/ok`` answers 200, ``/slow`` outlasts the read timeout, ``/status/<code>``
+    answers with that code. Requests are recorded on the server.
+    """
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append((self.path, self.client_address, json.loads(body)))
+        if self.path == '/slow':
+            time.sleep(1)
+        status_code = int(self.path.rsplit('/', 1)[1]) if self.path.startswith('/status/') else 200
+        self.send_response(status_code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(WEBHOOK_MAX_CONCURRENCY=2, WEBHOOK_READ_TIMEOUT=0.3)
+class DeliveryTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.requests = []
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(close_sessions)
+
+    def webhook(self, path):
+        host, port = self.server.server_address
+        return Webhook.objects.create(url=f"http://{host}:{port}{path}", event_type='product_updated')
+
+    def test_pooled_deliveries_reuse_connections(self):
+        webhook = self.webhook('/ok')
+        results = deliver_many([(webhook, {'n': n}) for n in range(8)])
+        self.assertTrue(all(result['success'] and result['status_code'] == 200 for result in results))
+        self.assertEqual(sorted(payload['n'] for _, _, payload in self.server.requests), list(range(8)))
+        # Two workers share the keep-alive pool instead of connecting per request
+        self.assertLessEqual(len({address for _, address, _ in self.server.requests}), 2)
+
+    def test_results_are_recorded_per_outcome(self):
+        cases = [('/ok', 'succeeded', 200), ('/status/503', 'retrying', 503),
+                 ('/slow', 'retrying', None), ('/status/404', 'failed', 404)]
+        deliveries = [
+            WebhookDelivery.objects.create(webhook=self.webhook(path), event_type='product_updated',
+                                           payload={'path': path})
+            for path, _, _ in cases
+        ]
+        results = deliver_many([(delivery.webhook, delivery.payload) for delivery in deliveries])
+        with mock.patch('webhooks.tasks.deliver_webhook') as retry:
+            for delivery, result in zip(deliveries, results):
+                record_result(delivery, result)
+
+        for delivery, (path, expected_status, status_code) in zip(deliveries, cases):
+            delivery.refresh_from_db()
+            self.assertEqual(delivery.status, expected_status, path)
+            self.assertEqual(delivery.status_code, status_code, path)
+            self.assertEqual(delivery.attempts, 1)
+        self.assertIn('timed out', deliveries[2].error)
+        # The 503 and the timeout are retried, the 404 is not
+        self.assertEqual(retry.apply_async.call_count, 2)
+
+    @override_settings(WEBHOOK_CIRCUIT_FAILURE_THRESHOLD=3)
+    def test_open_circuit_stops_the_rest_of_a_batch(self):
+        dead = self.webhook('/status/503')
+        healthy = self.webhook('/ok')
+        deliveries = WebhookDelivery.objects.bulk_create([
+            WebhookDelivery(webhook=webhook, event_type='product_updated', payload={'n': n})
+            for n in range(8) for webhook in (dead, healthy)
+        ])
+        with mock.patch('webhooks.tasks.deliver_webhook'), \
+                mock.patch('webhooks.circuit.invalidate_subscriptions'):
+            results = attempt_deliveries(deliveries)
+
+        paths = [path for path, _, _ in self.server.requests]
+        self.assertEqual(paths.count('/status/503'), 3)
+        self.assertEqual(paths.count('/ok'), 8)
+        self.assertEqual(len(results), 11)
+        held = WebhookDelivery.objects.filter(webhook=dead, attempts=0)
+        self.assertEqual(held.count(), 5)
+        self.assertTrue(all(delivery.status == 'retrying' and delivery.error == 'Circuit open' for delivery in held))
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import WebhookListCreateView, WebhookRetrieveUpdateDestroyView, WebhookTestView
+from .views import WebhookListCreateView, WebhookRetrieveUpdateDestroyView, WebhookDeliveryListView, WebhookTestView
 
 urlpatterns = [
     path('webhooks/', WebhookListCreateView.as_view(), name='webhook-list-create'),
     path('webhooks/<int:pk>/', WebhookRetrieveUpdateDestroyView.as_view(), name='webhook-detail'),
+    path('webhooks/<int:pk>/deliveries/', WebhookDeliveryListView.as_view(), name='webhook-deliveries'),
     path('webhooks/<int:pk>/test/', WebhookTestView.as_view(), name='webhook-test'),
 ]
\ No newline at end of file
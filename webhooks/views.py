@@ -1,10 +1,12 @@
 from django.shortcuts import render
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.response import Response
-from .models import Webhook
-from .serializers import WebhookSerializer
-import requests
+from .models import Webhook, WebhookDelivery
+from .serializers import WebhookSerializer, WebhookDeliverySerializer
+from .delivery import deliver
+from .subscriptions import invalidate_subscriptions
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,11 +15,37 @@ logger = logging.getLogger(__name__)
 class WebhookListCreateView(generics.ListCreateAPIView):
     queryset = Webhook.objects.all()
     serializer_class = WebhookSerializer
+    
+    def perform_create(self, serializer):
+        serializer.save()
+        transaction.on_commit(invalidate_subscriptions)
 
 
 class WebhookRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Webhook.objects.all()
     serializer_class = WebhookSerializer
+    
+    def perform_update(self, serializer):
+        serializer.save()
+        transaction.on_commit(invalidate_subscriptions)
+        
+    def perform_destroy(self, instance):
+        instance.delete()
+        transaction.on_commit(invalidate_subscriptions)
+
+
+class WebhookDeliveryListView(generics.ListAPIView):
+    """
+    Delivery log of one webhook, newest first; ``?status=`` filters it
+    """
+    serializer_class = WebhookDeliverySerializer
+    
+    def get_queryset(self):
+        queryset = WebhookDelivery.objects.filter(webhook_id=self.kwargs['pk'])
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        return queryset
 
 
 class WebhookTestView(generics.GenericAPIView):
@@ -36,25 +64,17 @@ class WebhookTestView(generics.GenericAPIView):
                 'timestamp': timezone.now().isoformat()
             }
             
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            
-            if webhook.secret_key:
-                headers['X-Webhook-Secret'] = webhook.secret_key
-            
-            try:
-                response = requests.post(webhook.url, json=payload, headers=headers, timeout=10)
-                return Response({
-                    'message': 'Webhook test sent successfully',
-                    'status_code': response.status_code,
-                    'response_time': response.elapsed.total_seconds()
-                }, status=status.HTTP_200_OK)
-            except requests.exceptions.RequestException as e:
+            result = deliver(webhook, payload)
+            if 'error' in result:
                 return Response({
                     'message': 'Failed to send webhook test',
-                    'error': str(e)
+                    'error': result['error']
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({
+                'message': 'Webhook test sent successfully',
+                'status_code': result['status_code'],
+                'response_time': result['latency_ms'] / 1000
+            }, status=status.HTTP_200_OK)
                 
         except Webhook.DoesNotExist:
             return Response({